@@ -1,21 +1,73 @@
+# First, so the startup clock includes every other import
+from startup import timer as startup_timer
+import asyncio
+import sys
+import time
 import discord
 from discord.ext import commands
-from config import TOKEN
+from config import TOKEN, MEMBERS_INTENT, SHARD_COUNT, SHARD_IDS, STARTUP_TARGET
+import content
+import cooldowns
+from data_manager import autosave_loop, flush, get_player, load_players, player_data, sync_loop
+import hooks
+from metrics import metrics
+from profiling import profiler
+from sharding import parse_shard_ids, format_shard_ids
 
 # Bot configuration
 intents = discord.Intents.default()
 intents.message_content = True
+# Whole member lists are opt-in (see MEMBERS_INTENT). Guilds are chunked the
+# first time one is needed rather than all of them at startup.
+intents.members = MEMBERS_INTENT
+options = dict(command_prefix='!', intents=intents, help_command=None, chunk_guilds_at_startup=False)
 
-bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
+if SHARD_COUNT:
+    # One worker of a sharded deployment (see sharding.py)
+    bot = commands.AutoShardedBot(**options, shard_count=SHARD_COUNT, shard_ids=parse_shard_ids(SHARD_IDS, SHARD_COUNT))
+else:
+    bot = commands.Bot(**options)
+metrics.install()
+profiler.install()
+hooks.install(bot)
+startup_timer.mark("imports")
+_connecting = None  # when bot.start() was called
 
 @bot.event
 async def on_ready():
     # This might conflict with the Basic cog's on_ready, but usually both run.
     # However, to be clean, let's keep the extension loading log here.
     print(f'🤖 Bot is ready: {bot.user.name}')
+    if SHARD_COUNT:
+        print(f'🧩 Serving shards {format_shard_ids(bot.shard_ids)} of {SHARD_COUNT}')
+    # on_ready fires again after reconnects; only the first one ends the start
+    if _connecting is not None and startup_timer.finish():
+        startup_timer.mark("gateway", _connecting)
+        report_startup()
+
+def report_startup():
+    # Once the gateway is ready and the players are in, whichever comes last
+    if startup_timer.ready is None or "players" not in startup_timer.phases:
+        return
+    print(startup_timer.report(STARTUP_TARGET))
+    for name, (start, end) in startup_timer.phases.items():
+        metrics.observe("bot_startup_seconds", end - start, (("phase", name),))
+
+def reseed_reminders(user_ids):
+    # Cooldowns another worker started
+    players = {user_id: get_player(user_id, create=False) for user_id in user_ids}
+    cooldowns.seed({user_id: player for user_id, player in players.items() if player})
+
+async def load_extension(extension):
+    start = time.perf_counter()
+    try:
+        await bot.load_extension(extension)
+        print(f'✅ Loaded extension: {extension} ({(time.perf_counter() - start) * 1000:.0f} ms)')
+    except Exception as e:
+        print(f'❌ Failed to load extension {extension}: {e}')
 
 async def load_extensions():
-    # Load cogs
+    # Load cogs. They don't depend on each other, so none waits on another.
     initial_extensions = [
         'cogs.basic',
         'cogs.profile',
@@ -23,23 +75,70 @@ async def load_extensions():
         'cogs.adventure',
         'cogs.inventory'
     ]
-    for extension in initial_extensions:
-        try:
-            await bot.load_extension(extension)
-            print(f'✅ Loaded extension: {extension}')
-        except Exception as e:
-            print(f'❌ Failed to load extension {extension}: {e}')
+    await asyncio.gather(*(load_extension(extension) for extension in initial_extensions))
+
+async def _timed(name, coro):
+    with startup_timer.phase(name):
+        return await coro
+
+async def _load_players():
+    await _timed("players", load_players())
+    report_startup()
+
+async def prepare():
+    """Gets the bot ready to connect. Returns a task reading in the player store.
+
+    The content is read in a worker thread while the cogs are set up on the
+    loop; cogs don't need it there yet, whatever they derive from it is
+    rebuilt when it lands. The player store is left loading in the
+    background, overlapping the gateway handshake: a command that comes in
+    before it's done loads it on the spot.
+    """
+    await asyncio.gather(
+        _timed("content", content.load()),
+        _timed("extensions", load_extensions()),
+    )
+    return asyncio.create_task(_load_players())
+
+async def remind(players_loaded):
+    await players_loaded
+    cooldowns.seed(player_data.records)
+    await cooldowns.reminder_loop(bot, get_player)
 
 # Main execution
 if __name__ == "__main__":
-    import asyncio
     async def main():
+        global _connecting
         async with bot:
-            await load_extensions()
-            await bot.start(TOKEN)
+            players_loaded = await prepare()
+            autosave = asyncio.create_task(autosave_loop())
+            watcher = asyncio.create_task(content.watch_loop())
+            # DMs go out through shard 0, so one worker sends all the reminders
+            reminding = not SHARD_COUNT or 0 in bot.shard_ids
+            tasks = []
+            if reminding:
+                tasks.append(asyncio.create_task(remind(players_loaded)))
+            if SHARD_COUNT:
+                tasks.append(asyncio.create_task(sync_loop(reseed_reminders if reminding else None)))
+            await metrics.serve()
+            try:
+                _connecting = time.perf_counter()
+                await bot.start(TOKEN)
+            finally:
+                players_loaded.cancel()
+                for task in tasks:
+                    task.cancel()
+                if metrics.server:
+                    metrics.server.close()
+                watcher.cancel()
+                autosave.cancel()
+                # Write whatever the autosave loop hasn't picked up yet
+                flush()
     
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         # Handle ctrl-c gracefully
         pass
+    except content.ContentError as e:
+        sys.exit(f"❌ Content is invalid, not starting. Fix it and check with `python catalog.py check`:\n{e}")
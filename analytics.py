@@ -0,0 +1,174 @@
+import json
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # optional; only the analytics commands need it
+    np = None
+
+from migrations import is_player_id, upgrade_record
+from rewards import DAILY_REWARD
+
+# Economy analytics.
+#
+# Player records are turned into one NumPy column per field, and every
+# figure is computed with whole-array operations over those columns. The
+# same code runs inside the bot (admin !economy) and offline against a
+# database snapshot:
+#
+#   python analytics.py [data.json | data.db] [--json]
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+SANITY_BINS = np.arange(0, 101, 10) if np is not None else None
+DAY = 24 * 3600
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("Economy analytics need NumPy: pip install numpy")
+
+def _unit_count(inventory):
+    # Stored records hold {item_id: count}; a loaded Player's Inventory has len() == units
+    if isinstance(inventory, dict):
+        return sum(inventory.values())
+    return len(inventory) if inventory else 0
+
+def columns(players):
+    """Columnar arrays from an iterable of (user_id, player)."""
+    require_numpy()
+    rows = [player for user_id, player in players if is_player_id(user_id)]
+    def column(field, default):
+        values = (p.get(field) for p in rows)
+        return np.fromiter((default if v is None else v for v in values), dtype=np.int64, count=len(rows))
+
+    pathways = [p.get("pathway") or "Civilian" for p in rows]
+    pathway_names, pathway_codes = np.unique(np.array(pathways, dtype=object), return_inverse=True) if rows else (np.array([]), np.array([], dtype=np.intp))
+    return {
+        "balance": column("balance", 0),
+        "level": column("level", 1),
+        "sanity": column("sanity", 100),
+        "sequence": column("sequence", 9),
+        "acting_mastery": column("acting_mastery", 0),
+        "items": np.fromiter((_unit_count(p.get("inventory")) for p in rows), dtype=np.int64, count=len(rows)),
+        "last_daily": column("last_daily", 0),
+        "last_work": column("last_work", 0),
+        "last_expedition": column("last_expedition", 0),
+        "pathway_code": pathway_codes,
+        "pathway_names": pathway_names,
+    }
+
+def gini(values):
+    """Gini coefficient of a non-negative array: 0 is perfect equality, 1 one holder."""
+    values = np.sort(values.astype(np.float64))
+    n = len(values)
+    total = values.sum()
+    if n == 0 or total == 0:
+        return 0.0
+    ranks = np.arange(1, n + 1)
+    return float(2 * (ranks * values).sum() / (n * total) - (n + 1) / n)
+
+def _summary(values):
+    if len(values) == 0:
+        return {"mean": 0, "min": 0, "max": 0, **{f"p{q}": 0 for q in PERCENTILES}}
+    points = np.percentile(values, PERCENTILES)
+    return {"mean": float(values.mean()), "min": int(values.min()), "max": int(values.max()),
+            **{f"p{q}": float(v) for q, v in zip(PERCENTILES, points)}}
+
+def analyze(players, npcs=None, now=None):
+    """Economy report (a plain dict) for every player in `players`.
+
+    `npcs` is {npc_id: record}; Will Auceptin's bankroll counts toward the
+    currency supply since it is money taken out of players' hands.
+    """
+    cols = columns(players)
+    now = int(time.time()) if now is None else now
+    npcs = npcs or {}
+    balance = cols["balance"]
+    n = len(balance)
+    bankroll = int(npcs.get("will_auceptin", {}).get("bankroll", 0))
+    player_supply = int(balance.sum())
+
+    # Per-pathway aggregates in one bincount per column
+    codes, names = cols["pathway_code"], cols["pathway_names"]
+    counts = np.bincount(codes, minlength=len(names))
+    def per_pathway(column):
+        return np.bincount(codes, weights=column, minlength=len(names))
+    balance_sum, level_sum, sanity_sum = per_pathway(balance), per_pathway(cols["level"]), per_pathway(cols["sanity"])
+    best_sequence = np.full(len(names), 9)
+    np.minimum.at(best_sequence, codes, cols["sequence"])
+    pathways = {
+        str(name): {
+            "players": int(counts[i]),
+            "balance": int(balance_sum[i]),
+            "mean_balance": float(balance_sum[i] / counts[i]),
+            "mean_level": float(level_sum[i] / counts[i]),
+            "mean_sanity": float(sanity_sum[i] / counts[i]),
+            "best_sequence": int(best_sequence[i]) if name != "Civilian" else None,
+        }
+        for i, name in enumerate(names)
+    }
+
+    # Cooldown stamps say who claimed what in the last day (most recent use only)
+    recent = {name: int((cols[f"last_{name}"] > now - DAY).sum()) for name in ("daily", "work", "expedition")}
+    levels = np.bincount(cols["level"]) if n else np.array([])
+    sanity_hist, _ = np.histogram(np.clip(cols["sanity"], 0, 100), bins=SANITY_BINS)
+
+    return {
+        "players": n,
+        "supply": {
+            "players": player_supply,
+            "will_auceptin": bankroll,
+            "total": player_supply + bankroll,
+        },
+        "balance": {**_summary(balance), "gini": gini(balance),
+                    "top_1pct_share": float(np.sort(balance)[-max(1, n // 100):].sum() / player_supply) if player_supply else 0.0},
+        "level": {**_summary(cols["level"]), "distribution": {int(l): int(c) for l, c in enumerate(levels) if c}},
+        "sanity": {**_summary(cols["sanity"]),
+                   "histogram": {f"{lo}-{hi - 1 if hi < 100 else 100}": int(c) for lo, hi, c in zip(SANITY_BINS[:-1].tolist(), SANITY_BINS[1:].tolist(), sanity_hist)},
+                   "broken": int((cols["sanity"] <= 0).sum())},
+        "items": {"total": int(cols["items"].sum()), "mean": float(cols["items"].mean()) if n else 0.0},
+        "last_24h": {**recent, "daily_minted": recent["daily"] * DAILY_REWARD},
+        "pathways": pathways,
+    }
+
+def format_report(report):
+    """The report as plain text, for the CLI."""
+    b, s = report["balance"], report["supply"]
+    lines = [
+        f"Players: {report['players']}",
+        f"Currency supply: {s['total']} pence ({s['players']} held by players, {s['will_auceptin']} by Will Auceptin)",
+        f"Balance: mean {b['mean']:.1f}, median {b['p50']:.0f}, p90 {b['p90']:.0f}, p99 {b['p99']:.0f}, max {b['max']}",
+        f"  Gini {b['gini']:.3f}, top 1% hold {b['top_1pct_share']:.1%}",
+        f"Level: mean {report['level']['mean']:.1f}, median {report['level']['p50']:.0f}, max {report['level']['max']}",
+        f"Sanity: mean {report['sanity']['mean']:.1f}, {report['sanity']['broken']} broken",
+        "  " + ", ".join(f"{k}: {v}" for k, v in report["sanity"]["histogram"].items()),
+        f"Last 24h: {report['last_24h']['daily']} daily claims ({report['last_24h']['daily_minted']} pence minted), "
+        f"{report['last_24h']['work']} workers, {report['last_24h']['expedition']} expeditions",
+        "Pathways:",
+    ]
+    for name, p in sorted(report["pathways"].items(), key=lambda kv: -kv[1]["players"]):
+        best = f", best S{p['best_sequence']}" if p["best_sequence"] is not None else ""
+        lines.append(f"  {name}: {p['players']} players, {p['balance']} pence (mean {p['mean_balance']:.0f}), "
+                     f"mean level {p['mean_level']:.1f}, mean sanity {p['mean_sanity']:.0f}{best}")
+    return "\n".join(lines)
+
+def load_snapshot(filename=None):
+    """Every record from a database file (.json or .db/.sqlite), or the configured store."""
+    from storage import JsonStore, SqliteStore, open_store
+    if filename is None:
+        store = open_store()
+    elif filename.endswith((".db", ".sqlite", ".sqlite3")):
+        store = SqliteStore(filename)
+    else:
+        store = JsonStore(filename)
+    records = store.load_all()
+    store.close()
+    for record_id, record in records.items():
+        upgrade_record(record_id, record)
+    return records
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    records = load_snapshot(args[0] if args else None)
+    report = analyze(records.items(), {k: v for k, v in records.items() if not is_player_id(k)})
+    print(json.dumps(report, indent=2) if "--json" in sys.argv[1:] else format_report(report))
@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Cold start of the bot against a synthetic player population, with the
+# gateway taken as ready the moment the bot would connect (so the player load
+# shows how much of it a real handshake would have to hide). Each run is a
+# fresh process, so imports are included; the breakdown is the bot's own
+# startup report.
+#
+# Usage: python benchmarks/cold_start.py [--players 50000] [--backend json|sqlite] [--runs 3]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+CHILD = """
+import asyncio
+import Fully_Automatic_Wishing_Machine as bot_module
+async def main():
+    async with bot_module.bot:
+        players_loaded = await bot_module.prepare()
+        # Where the bot would connect; the gateway handshake overlaps the player load
+        bot_module.startup_timer.finish()
+        await players_loaded
+asyncio.run(main())
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the bot's cold start.")
+    parser.add_argument("--players", type=int, default=50000)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DB_FILE=os.path.join(tmp, "data.json"), SQLITE_FILE=os.path.join(tmp, "data.db"),
+                   JOURNAL_FILE=os.path.join(tmp, "data.journal"), STORAGE_BACKEND=args.backend)
+        os.environ.update(env)
+        # Imported only now that config will point at the temporary files
+        from player_memory import synthetic_records
+        from storage import open_store
+        with open("items.json") as f:
+            item_ids = list(json.load(f))
+        records = json.loads(synthetic_records(args.players, item_ids, args.seed))
+        store = open_store(args.backend)
+        store.write(store.prepare(records, records.keys()))
+        store.close()
+
+        print(f"{args.players} players, {args.backend} store")
+        for run in range(1, args.runs + 1):
+            out = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True).stdout
+            report = out[out.index("⏱️"):]
+            print(f"\nRun {run}:\n{report.rstrip()}")
+
+if __name__ == "__main__":
+    main()
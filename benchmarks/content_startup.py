@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import time
+
+# Startup cost of loading the static content: raw JSON sources vs the bundle.
+# Usage: python benchmarks/content_startup.py [repeat]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+import catalog
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = os.path.join(tmp, "content.bundle")
+        catalog.build(bundle_path)
+        raw = best_of(repeat, lambda: [catalog.read_source(name) for name in catalog.SOURCE_FILES])
+        validated = best_of(repeat, lambda: catalog.check_references(catalog.read_all()))
+        bundled = best_of(repeat, lambda: catalog.load_bundle(bundle_path))
+
+    print(f"best of {repeat}")
+    print(f"  raw JSON sources:          {raw * 1000:7.2f} ms")
+    print(f"  raw JSON + validation:     {validated * 1000:7.2f} ms")
+    print(f"  bundle (with stale check): {bundled * 1000:7.2f} ms  ({raw / bundled:.1f}x faster than raw)")
+
+if __name__ == "__main__":
+    main()
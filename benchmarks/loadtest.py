@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+# Load test: drives the real command callbacks in cogs/ with fake contexts
+# and interactions (no Discord connection) against a synthetic player
+# population, then measures what persistence costs as the population grows.
+#
+# Usage: python benchmarks/loadtest.py [--players 10000] [--commands 20000]
+#            [--concurrency 50] [--backend json|sqlite] [--persist-sizes 1000,10000,50000]
+#
+# Everything is written to a temporary directory; the repo's own data files
+# are never touched. Nothing that imports config may be imported before the
+# environment points it there.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+# name: weight in the command mix
+MIX = {
+    "work": 25,
+    "balance": 10,
+    "expedition": 15,
+    "profile": 10,
+    "inventory": 8,
+    "casino": 8,
+    "act": 8,
+    "daily": 5,
+    "item": 5,
+    "leaderboard": 3,
+    "stats_button": 3,
+}
+
+
+class FakePermissions:
+    administrator = False
+
+class FakeUser:
+    bot = False
+    avatar = None
+
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = self.display_name = f"player{user_id}"
+        self.mention = f"<@{user_id}>"
+        self.guild_permissions = FakePermissions()
+
+class FakeContext:
+    guild = None
+
+    def __init__(self, bot, user):
+        self.bot = bot
+        self.author = user
+        self.view = None
+
+    async def send(self, content=None, **kwargs):
+        self.view = kwargs.get("view", self.view)
+        # Hand control back to the loop, as a real HTTP call would
+        await asyncio.sleep(0)
+
+class FakeResponse:
+    async def send_message(self, content=None, **kwargs):
+        await asyncio.sleep(0)
+
+    async def edit_message(self, **kwargs):
+        await asyncio.sleep(0)
+
+class FakeInteraction:
+    def __init__(self, user):
+        self.user = user
+        self.response = FakeResponse()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+def write_population(backend, count, seed):
+    """Stores `count` synthetic players with the configured backend, returns their ids."""
+    from player_memory import synthetic_records
+    from storage import open_store
+    with open("items.json") as f:
+        item_ids = list(json.load(f))
+    records = json.loads(synthetic_records(count, item_ids, seed))
+    store = open_store(backend)
+    store.write(store.prepare(records, records.keys()))
+    store.close()
+    return [int(user_id) for user_id in records]
+
+async def call(bot, name, user, rng, item_names):
+    ctx = FakeContext(bot, user)
+    if name == "stats_button":
+        command = bot.get_command("stats")
+        await command.callback(command.cog, ctx)
+        if ctx.view is not None:
+            await ctx.view.children[0].callback(FakeInteraction(user))
+        return
+    command = bot.get_command(name)
+    if name == "casino":
+        await command.callback(command.cog, ctx, str(rng.randint(1, 50)))
+    elif name == "item":
+        await command.callback(command.cog, ctx, name=rng.choice(item_names))
+    elif name == "leaderboard":
+        await command.callback(command.cog, ctx, rng.choice(["balance", "level", "sequence", "mastery"]))
+    else:
+        await command.callback(command.cog, ctx)
+
+async def command_mix(args, user_ids):
+    import Fully_Automatic_Wishing_Machine as bot_module
+    import data_manager
+    bot = bot_module.bot
+    with contextlib.redirect_stdout(io.StringIO()):
+        await (await bot_module.prepare())
+    # Settle the schema migrations of the synthetic records before timing
+    await data_manager.flush_async()
+
+    rng = random.Random(args.seed)
+    item_names = [item["name"] for item in data_manager.items_db.values()]
+    names, weights = list(MIX), list(MIX.values())
+    jobs = [(name, FakeUser(rng.choice(user_ids))) for name in rng.choices(names, weights, k=args.commands)]
+    timings = defaultdict(list)
+    errors = Counter()
+
+    async def worker():
+        while jobs:
+            name, user = jobs.pop()
+            start = time.perf_counter()
+            try:
+                await call(bot, name, user, rng, item_names)
+            except Exception as e:
+                errors[name] += 1
+                if errors[name] == 1:
+                    print(f"⚠️ {name} raised {type(e).__name__}: {e}")
+            timings[name].append(time.perf_counter() - start)
+
+    autosave = asyncio.create_task(data_manager.autosave_loop())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - start
+    autosave.cancel()
+    flush_start = time.perf_counter()
+    await data_manager.flush_async()
+    final_flush = time.perf_counter() - flush_start
+
+    print(f"\n{args.commands} commands from {len(user_ids)} players, {args.concurrency} concurrent, {args.backend} store")
+    print(f"Throughput: {args.commands / wall:,.0f} commands/s ({wall:.2f}s), final flush {final_flush * 1000:.1f} ms")
+    print(f"{'command':<14}{'count':>7}{'errors':>7}{'mean ms':>9}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for name in sorted(timings, key=lambda n: -len(timings[n])):
+        values = sorted(timings[name])
+        mean = sum(values) / len(values)
+        print(f"{name:<14}{len(values):>7}{errors[name]:>7}{mean * 1000:>9.3f}"
+              f"{percentile(values, 50) * 1000:>8.3f}{percentile(values, 95) * 1000:>8.3f}{percentile(values, 99) * 1000:>8.3f}")
+    cache = data_manager.player_data.stats()
+    print(f"Player cache: {cache['size']} resident, {cache['hit_rate']:.1%} hits, {cache['evictions']} evictions")
+
+def persistence_costs(sizes, tmp, seed):
+    from migrations import upgrade_record
+    from player import Player
+    from player_memory import synthetic_records
+    from storage import JsonStore, SqliteStore
+    with open("items.json") as f:
+        item_ids = list(json.load(f))
+
+    print("\nPersistence cost vs player count")
+    print(f"{'players':>8} {'store':<7}{'full save ms':>13}{'50 dirty ms':>12}{'cold get ms':>12}{'file MiB':>10}")
+    for count in sizes:
+        raw = json.loads(synthetic_records(count, item_ids, seed))
+        records = {}
+        for user_id, record in raw.items():
+            upgrade_record(user_id, record)
+            records[user_id] = Player.from_dict(record)
+        ids = list(records)
+        dirty = random.Random(seed).sample(ids, min(50, count))
+        for store in (JsonStore(os.path.join(tmp, f"persist_{count}.json")),
+                      SqliteStore(os.path.join(tmp, f"persist_{count}.db"))):
+            start = time.perf_counter()
+            store.write(store.prepare(records, ids))
+            full = time.perf_counter() - start
+            start = time.perf_counter()
+            store.write(store.prepare(records, dirty))
+            partial = time.perf_counter() - start
+            # Loading one player the cache doesn't hold
+            lookups = dirty[:20]
+            start = time.perf_counter()
+            for user_id in lookups:
+                store.load(user_id)
+            cold = (time.perf_counter() - start) / len(lookups)
+            size = os.path.getsize(store.filename) / 2**20
+            store.close()
+            print(f"{count:>8} {store.name:<7}{full * 1000:>13.1f}{partial * 1000:>12.1f}{cold * 1000:>12.3f}{size:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the cog commands with a synthetic load.")
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--commands", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--persist-sizes", default="1000,10000,50000",
+                        help="comma-separated player counts for the persistence table ('' to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before anything imports config
+        os.environ.update({
+            "DB_FILE": os.path.join(tmp, "data.json"),
+            "SQLITE_FILE": os.path.join(tmp, "data.db"),
+            "JOURNAL_FILE": os.path.join(tmp, "data.journal"),
+            "STORAGE_BACKEND": args.backend,
+            "CONTENT_WATCH_INTERVAL": "0",
+        })
+        user_ids = write_population(args.backend, args.players, args.seed)
+        asyncio.run(command_mix(args, user_ids))
+        sizes = [int(s) for s in args.persist_sizes.split(",") if s]
+        if sizes:
+            persistence_costs(sizes, tmp, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Bytes per player: stored dict records vs Player objects.
+# Usage: python benchmarks/player_memory.py [player_count]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import COC_STATS, PATHWAY_STATS
+from player import Player
+
+def synthetic_records(count, item_ids, seed=0):
+    rng = random.Random(seed)
+    now = datetime.now()
+    pathways = list(PATHWAY_STATS)
+    records = {}
+    for i in range(count):
+        pathway = rng.choice(pathways) if rng.random() < 0.8 else None
+        records[str(10**17 + i)] = {
+            "balance": rng.randint(0, 50000),
+            "pathway": pathway,
+            "sequence": rng.randint(5, 9) if pathway else 9,
+            "acting_name": "Seer" if pathway else "Civilian",
+            "level": rng.randint(1, 40),
+            "xp": rng.randint(0, 99),
+            "max_xp": 100,
+            "acting_xp": rng.randint(0, 200),
+            "acting_max_xp": 200,
+            "sanity": rng.randint(0, 100),
+            "inventory": [rng.choice(item_ids) for _ in range(rng.randint(0, 40))],
+            "last_daily": (now - timedelta(hours=rng.randint(0, 48))).isoformat(),
+            "last_work": (now - timedelta(minutes=rng.randint(0, 120))).isoformat(),
+            "last_expedition": (now - timedelta(hours=rng.randint(0, 6))).isoformat() if pathway else None,
+            "last_act": None,
+            "acting_mastery": rng.randint(0, 30),
+            "affiliation": "Unofficial Beyonder" if pathway else "Neutral",
+            "stats": {s: rng.randint(1, 12) for s in COC_STATS},
+            "stat_points": rng.randint(0, 10),
+            "schema": 3,
+        }
+    # Round-trip through JSON so strings aren't shared, as when loaded from disk
+    return json.dumps(records)
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "items.json")) as f:
+        item_ids = list(json.load(f))
+    payload = synthetic_records(count, item_ids)
+
+    dicts, dict_bytes = measure(lambda: json.loads(payload))
+    del dicts
+    players, player_bytes = measure(lambda: {k: Player.from_dict(v) for k, v in json.loads(payload).items()})
+    del players
+
+    print(f"{count} synthetic players")
+    print(f"  dict records:   {dict_bytes / count:8.0f} bytes/player  ({dict_bytes / 2**20:.1f} MiB)")
+    print(f"  Player records: {player_bytes / count:8.0f} bytes/player  ({player_bytes / 2**20:.1f} MiB)")
+    print(f"  saved: {1 - player_bytes / dict_bytes:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import random
+import sys
+import time
+from bisect import bisect_left, insort
+
+# Cost of keeping a leaderboard sorted as players change: one flat sorted
+# list (bisect + insort, every update shifting up to n keys) vs the bucketed
+# SortedKeys the boards use. Each update moves a random player to a new
+# balance, as a command changing it would.
+#
+# Usage: python benchmarks/rank_index.py [--players 10000,50000,200000] [--updates 20000]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from leaderboard import SortedKeys
+
+class FlatKeys:
+    def __init__(self, keys=()):
+        self.keys = sorted(keys)
+
+    def add(self, key):
+        insort(self.keys, key)
+
+    def remove(self, key):
+        del self.keys[bisect_left(self.keys, key)]
+
+    def index(self, key):
+        return bisect_left(self.keys, key)
+
+def run(cls, players, updates, seed):
+    rng = random.Random(seed)
+    current = {user_id: (-rng.randrange(10**6), user_id) for user_id in range(players)}
+    keys = cls(current.values())
+    moves = [(rng.randrange(players), -rng.randrange(10**6)) for _ in range(updates)]
+    start = time.perf_counter()
+    for user_id, balance in moves:
+        keys.remove(current[user_id])
+        current[user_id] = (balance, user_id)
+        keys.add(current[user_id])
+    update = (time.perf_counter() - start) / updates
+    probes = [current[rng.randrange(players)] for _ in range(updates)]
+    start = time.perf_counter()
+    for key in probes:
+        keys.index(key)
+    rank = (time.perf_counter() - start) / updates
+    return update, rank
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Time leaderboard updates at several player counts.")
+    parser.add_argument("--players", default="10000,50000,200000")
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'players':>8} {'flat update µs':>15} {'bucketed update µs':>19} {'flat rank µs':>13} {'bucketed rank µs':>17}")
+    for players in (int(n) for n in args.players.split(",")):
+        flat_update, flat_rank = run(FlatKeys, players, args.updates, args.seed)
+        bucket_update, bucket_rank = run(SortedKeys, players, args.updates, args.seed)
+        print(f"{players:>8} {flat_update * 1e6:>15.2f} {bucket_update * 1e6:>19.2f} "
+              f"{flat_rank * 1e6:>13.2f} {bucket_rank * 1e6:>17.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Multi-process smoke test for the sharded mode.
+#
+# Starts several worker processes on one sqlite store, each serving a range
+# of shards the way sharding.py would, but with a stand-in for the Discord
+# gateway: every worker generates the same seeded stream of events (a guild,
+# a member, a command) and handles the ones whose guild falls on its shards,
+# calling the command callbacks directly as benchmarks/loadtest.py does.
+# Members belong to many guilds, so the same players are changed by every
+# worker at once.
+#
+# Besides real commands the stream holds "deposits": transactions adding 1 to
+# a counter on the player, retried when refused as stale. Each worker reports
+# how many of its deposits landed; once all have exited the counters in the
+# store must add up exactly, or an update was lost to a stale cache.
+#
+# Usage: python benchmarks/shards.py [--workers 4] [--shards 8] [--events 20000]
+#            [--players 200] [--guilds 64] [--concurrency 20]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+
+COUNTER = "smoke_deposits"
+DEPOSIT_SHARE = 0.3
+MAX_RETRIES = 20
+
+def events(args):
+    """The seeded stream every worker sees: (guild_id, user_id, command or None for a deposit)."""
+    from loadtest import MIX
+    rng = random.Random(args.seed)
+    # Guild i lands on shard i % shards; the low 22 bits of a snowflake are noise
+    guilds = [(i << 22) | rng.getrandbits(22) for i in range(args.guilds)]
+    users = [10**17 + i for i in range(args.players)]
+    names, weights = list(MIX), list(MIX.values())
+    for _ in range(args.events):
+        command = None if rng.random() < DEPOSIT_SHARE else rng.choices(names, weights)[0]
+        yield rng.choice(guilds), rng.choice(users), command
+
+async def run_worker(args):
+    import Fully_Automatic_Wishing_Machine as bot_module
+    import data_manager
+    from loadtest import FakeUser, call
+    from sharding import shard_for
+    from storage import StaleWrite
+    from transactions import player_tx
+    bot = bot_module.bot
+    with contextlib.redirect_stdout(io.StringIO()):
+        await (await bot_module.prepare())
+    mine = [e for e in events(args) if shard_for(e[0], args.shards) in bot.shard_ids]
+    deposits = Counter()
+    stale = Counter()
+    errors = Counter()
+    rng = random.Random(args.seed + len(bot.shard_ids))
+    item_names = [item["name"] for item in data_manager.items_db.values()]
+
+    async def deposit(user_id):
+        for _ in range(MAX_RETRIES):
+            try:
+                async with player_tx(user_id) as player:
+                    player[COUNTER] = player.get(COUNTER, 0) + 1
+                    # Hold the record across an await, as a command replying would
+                    await asyncio.sleep(0)
+                deposits[str(user_id)] += 1
+                return
+            except StaleWrite:
+                stale["deposit"] += 1
+        errors["deposit gave up"] += 1
+
+    async def worker():
+        while mine:
+            _, user_id, command = mine.pop()
+            if command is None:
+                await deposit(user_id)
+                continue
+            try:
+                await call(bot, command, FakeUser(user_id), rng, item_names)
+            except StaleWrite:
+                stale[command] += 1
+            except Exception as e:
+                errors[f"{command}: {type(e).__name__}: {e}"] += 1
+
+    print("ready", flush=True)
+    sys.stdin.readline()  # every worker starts on the parent's signal
+    count = len(mine)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"shards": bot.shard_ids, "events": count, "seconds": elapsed,
+                      "deposits": deposits, "stale": stale, "errors": errors}), flush=True)
+
+def run(args):
+    from sharding import shard_ranges, worker_env
+    with tempfile.TemporaryDirectory() as tmp:
+        base = dict(os.environ, SQLITE_FILE=os.path.join(tmp, "data.db"), DB_FILE=os.path.join(tmp, "data.json"),
+                    JOURNAL_FILE=os.path.join(tmp, "data.journal"), CONTENT_WATCH_INTERVAL="0",
+                    METRICS_PORT="0")
+        command = [sys.executable, os.path.abspath(__file__), "--worker"] + sys.argv[1:]
+        procs = [subprocess.Popen(command, env=worker_env(i, args.shards, ids, base), text=True,
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+                 for i, ids in enumerate(shard_ranges(args.shards, args.workers))]
+        for proc in procs:
+            while proc.stdout.readline().strip() != "ready":
+                if proc.poll() is not None:
+                    sys.exit(f"❌ A worker failed to start (exit code {proc.returncode})")
+        start = time.perf_counter()
+        for proc in procs:
+            proc.stdin.write("go\n")
+            proc.stdin.flush()
+        reports = [json.loads(proc.stdout.read().strip().splitlines()[-1]) for proc in procs]
+        wall = time.perf_counter() - start
+        for proc in procs:
+            proc.wait()
+
+        from storage import SqliteStore
+        store = SqliteStore(os.path.join(tmp, "data.db"))
+        records = store.load_all()
+        store.close()
+
+    expected = Counter()
+    total = 0
+    print(f"{len(procs)} workers, {args.shards} shards, {args.players} players in {args.guilds} guilds")
+    for i, report in enumerate(reports):
+        expected.update(report["deposits"])
+        total += report["events"]
+        stale = sum(report["stale"].values())
+        print(f"  worker{i} shards {report['shards']}: {report['events']} events in {report['seconds']:.2f}s "
+              f"({report['events'] / report['seconds']:,.0f}/s), {stale} stale writes retried or refused")
+        for error, n in report["errors"].items():
+            print(f"    ⚠️ {n}x {error}")
+    print(f"Overall: {total / wall:,.0f} events/s")
+    lost = {user_id: (n, records.get(user_id, {}).get(COUNTER, 0)) for user_id, n in expected.items()
+            if records.get(user_id, {}).get(COUNTER, 0) != n}
+    if lost:
+        print(f"❌ {len(lost)} players' counters disagree (expected, stored): {dict(list(lost.items())[:5])}")
+        sys.exit(1)
+    print(f"✅ All {sum(expected.values())} deposits to {len(expected)} players accounted for")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run several sharded workers against one store.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--guilds", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        asyncio.run(run_worker(args))
+    else:
+        run(args)
@@ -0,0 +1,213 @@
+import json
+import os
+import pickle
+import sys
+from config import ITEMS_FILE, EFFECTS_FILE, RECIPES_FILE, LOOT_FILE, PATHWAYS_DIR, CONTENT_BUNDLE, PATHWAY_STATS
+
+# Reading, validating and bundling the static content.
+#
+# `python catalog.py build` checks every catalog (shape and cross references)
+# and compiles them into CONTENT_BUNDLE, a single pickle that is read in one
+# go instead of parsing ~25 JSON files. At startup load_content() uses the
+# bundle when it was built from the current sources, so the validation cost
+# is paid once at build time. Otherwise it falls back to the JSON files and
+# runs the same checks on them: content that fails is never loaded.
+
+SOURCE_FILES = {
+    "items": ITEMS_FILE,
+    "effects": EFFECTS_FILE,
+    "recipes": RECIPES_FILE,
+    "pathways": PATHWAYS_DIR,
+    "loot": LOOT_FILE,
+}
+BUNDLE_FORMAT = 1
+
+class ContentError(Exception):
+    pass
+
+def _read_json(path):
+    # Unlike data_manager.load_json, a broken file is an error here
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise ContentError(f"{path}: {e}") from e
+
+def read_source(name):
+    path = SOURCE_FILES[name]
+    if name != "pathways":
+        return _read_json(path)
+    pathways = {}
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith(".json"):
+            data = _read_json(os.path.join(path, filename))
+            if "name" not in data:
+                raise ContentError(f"{filename}: missing \"name\"")
+            pathways[data["name"]] = data
+    return pathways
+
+def signature(name):
+    # Cheap change detection: modification time and size of the file(s)
+    path = SOURCE_FILES[name]
+    try:
+        if name != "pathways":
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        return tuple((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                     for entry in sorted(os.scandir(path), key=lambda e: e.name)
+                     if entry.name.endswith(".json"))
+    except OSError:
+        return None
+
+def validate(name, data):
+    """Checks the shape of one catalog, raising ContentError."""
+    if not isinstance(data, dict) or not data:
+        raise ContentError(f"{name}: expected a non-empty object")
+    if name in ("items", "effects"):
+        for key, entry in data.items():
+            if not isinstance(entry, dict) or "name" not in entry:
+                raise ContentError(f"{name}: {key} has no name")
+    elif name == "recipes":
+        for category, entries in data.items():
+            for recipe_id, recipe in entries.items():
+                if "name" not in recipe or not isinstance(recipe.get("ingredients"), dict):
+                    raise ContentError(f"recipes: {category}/{recipe_id} needs a name and ingredients")
+    elif name == "pathways":
+        for pathway_name, pathway in data.items():
+            if "9" not in pathway.get("sequences", {}):
+                raise ContentError(f"pathways: {pathway_name} has no sequence 9")
+    elif name == "loot":
+        if not isinstance(data.get("tiers"), dict) or not isinstance(data.get("tables"), dict):
+            raise ContentError("loot: needs \"tiers\" and \"tables\" objects")
+        if data.get("default_tier", "common") not in data["tiers"]:
+            raise ContentError(f"loot: default tier '{data.get('default_tier', 'common')}' is not a tier")
+        for table_name, table in data["tables"].items():
+            weights = table.get("weights")
+            if not isinstance(weights, dict) or any(not isinstance(w, (int, float)) or w < 0 for w in weights.values()):
+                raise ContentError(f"loot: table {table_name} needs non-negative tier weights")
+            if not any(weights.values()):
+                raise ContentError(f"loot: table {table_name} has no weight on any tier")
+            if int(table.get("rolls", 1)) < 1:
+                raise ContentError(f"loot: table {table_name} must roll at least once")
+
+def check_references(catalogs):
+    """Cross-catalog checks. Returns a list of problems (empty when consistent)."""
+    items, effects = catalogs["items"], catalogs["effects"]
+    recipes, pathways = catalogs["recipes"], catalogs["pathways"]
+    problems = []
+    for item_id, item in items.items():
+        for effect in item.get("effects", []):
+            if effect not in effects:
+                problems.append(f"item {item_id}: unknown effect '{effect}'")
+    for category, entries in recipes.items():
+        for recipe_id, recipe in entries.items():
+            for ing_id in recipe["ingredients"]:
+                if ing_id not in items:
+                    problems.append(f"recipe {category}/{recipe_id}: unknown ingredient '{ing_id}'")
+            if recipe.get("effect") and recipe["effect"] not in effects:
+                problems.append(f"recipe {category}/{recipe_id}: unknown effect '{recipe['effect']}'")
+    for pathway_name in sorted(set(pathways) - set(PATHWAY_STATS)):
+        problems.append(f"pathway {pathway_name}: no entry in PATHWAY_STATS")
+    for pathway_name in sorted(set(PATHWAY_STATS) - set(pathways)):
+        problems.append(f"PATHWAY_STATS {pathway_name}: no pathway file")
+    for pathway_name, pathway in pathways.items():
+        numbers = sorted(int(seq) for seq in pathway["sequences"])
+        # Sequences run from 9 down with no gaps
+        if numbers != list(range(numbers[0], 10)):
+            problems.append(f"pathway {pathway_name}: sequences {numbers} are not contiguous down from 9")
+    loot = catalogs.get("loot")
+    if loot:
+        tiered = {}
+        for tier_name, tier in loot["tiers"].items():
+            for item_id in tier.get("items", []):
+                if item_id not in items:
+                    problems.append(f"loot tier {tier_name}: unknown item '{item_id}'")
+                elif item_id in tiered:
+                    problems.append(f"loot tier {tier_name}: '{item_id}' is already {tiered[item_id]}")
+                else:
+                    tiered[item_id] = tier_name
+        for table_name, table in loot["tables"].items():
+            for tier_name in table["weights"]:
+                if tier_name not in loot["tiers"]:
+                    problems.append(f"loot table {table_name}: unknown tier '{tier_name}'")
+        for tier_name in loot.get("sequence_bonus", {}):
+            if tier_name not in loot["tiers"]:
+                problems.append(f"loot sequence_bonus: unknown tier '{tier_name}'")
+        for pathway_name, item_ids in loot.get("pathways", {}).items():
+            if pathway_name not in pathways:
+                problems.append(f"loot pathway {pathway_name}: no pathway file")
+            for item_id in item_ids:
+                if item_id not in items:
+                    problems.append(f"loot pathway {pathway_name}: unknown item '{item_id}'")
+    return problems
+
+def read_all():
+    """Reads and validates every catalog from its source files."""
+    catalogs = {}
+    for name in SOURCE_FILES:
+        catalogs[name] = read_source(name)
+        validate(name, catalogs[name])
+    return catalogs
+
+def read_checked():
+    """read_all() plus the cross references: every catalog, or ContentError."""
+    catalogs = read_all()
+    problems = check_references(catalogs)
+    if problems:
+        raise ContentError("\n".join(problems))
+    return catalogs
+
+def build(path=CONTENT_BUNDLE):
+    signatures = {name: signature(name) for name in SOURCE_FILES}
+    catalogs = read_checked()
+    bundle = {"format": BUNDLE_FORMAT, "signatures": signatures, "catalogs": catalogs}
+    with open(path, 'wb') as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return catalogs
+
+def load_bundle(path=CONTENT_BUNDLE):
+    """The bundled catalogs, or None when there is no bundle or it is stale."""
+    try:
+        with open(path, 'rb') as f:
+            bundle = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if bundle.get("format") != BUNDLE_FORMAT:
+        return None
+    if any(bundle["signatures"].get(name) != signature(name) for name in SOURCE_FILES):
+        return None
+    return bundle["catalogs"]
+
+def load_content():
+    """The bundle when it is up to date, else the JSON sources put through the same checks as build().
+
+    Raises ContentError rather than return content that didn't pass them.
+    """
+    catalogs = load_bundle()
+    if catalogs is not None:
+        return catalogs
+    if os.path.exists(CONTENT_BUNDLE):
+        print(f'⚠️ {CONTENT_BUNDLE} is out of date, loading the JSON sources. Run `python catalog.py build`.')
+    return read_checked()
+
+if __name__ == "__main__":
+    # python catalog.py build|check
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command not in ("build", "check"):
+        print("Usage: python catalog.py build|check")
+        sys.exit(1)
+    try:
+        if command == "build":
+            catalogs = build()
+            recipe_count = sum(len(entries) for entries in catalogs["recipes"].values())
+            print(f"✅ Wrote {CONTENT_BUNDLE}: {len(catalogs['items'])} items, {len(catalogs['effects'])} effects, "
+                  f"{recipe_count} recipes, {len(catalogs['pathways'])} pathways, {len(catalogs['loot']['tables'])} loot tables")
+        else:
+            problems = check_references(read_all())
+            for problem in problems:
+                print(f"❌ {problem}")
+            print(f"{len(problems)} problems found.")
+            sys.exit(1 if problems else 0)
+    except ContentError as e:
+        print(f"❌ Content is invalid:\n{e}")
+        sys.exit(1)
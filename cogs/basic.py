@@ -1,6 +1,11 @@
 import discord
 from discord.ext import commands
-from data_manager import save_json, DB_FILE, player_data
+import content
+from data_manager import reset_players, player_data
+from metrics import metrics
+from profiling import profiler
+from render_cache import render_cache
+from utils import grant_xp, guild_members
 
 class Basic(commands.Cog):
     def __init__(self, bot):
@@ -12,21 +17,149 @@ class Basic(commands.Cog):
     
     @commands.command(name="help")
     async def custom_help(self, ctx):
+        is_admin = ctx.author.guild_permissions.administrator
+        await ctx.send(**render_cache.get(("help", is_admin), lambda: {"embed": self.build_help(is_admin)}))
+
+    def build_help(self, is_admin):
         embed = discord.Embed(title="📖 Beyonder's Handbook (Help)", color=0x34495E)
-        embed.add_field(name="🧬 Progression", value="`!pathways`, `!choose [name]`, `!profile`, `!abilities`, `!act`, `!advance`, `!stats [name]` (New!)", inline=False)
+        embed.add_field(name="🧬 Progression", value="`!pathways`, `!choose [name]`, `!profile`, `!abilities`, `!act`, `!advance`, `!stats [name]`, `!leaderboard [balance|level|sequence|mastery] [global]` (New!)", inline=False)
         embed.add_field(name="💰 Economy", value="`!balance`, `!daily`, `!work`, `!casino`", inline=False)
-        embed.add_field(name="🎒 Mysticism", value="`!expedition`, `!inventory`, `!item [name]`, `!recipes`", inline=False)
-        embed.add_field(name="⚗️ Crafting", value="`!alchemy`, `!forge`", inline=False)
-        if ctx.author.guild_permissions.administrator:
-            embed.add_field(name="⚙️ Admin", value="`!reset`", inline=False)
-        await ctx.send(embed=embed)
+        embed.add_field(name="🎒 Mysticism", value="`!expedition`, `!remind [name] [on|off]`, `!inventory`, `!item [name]`, `!recipes`", inline=False)
+        embed.add_field(name="⚗️ Crafting", value="`!alchemy [amount] [name]`, `!forge [amount] [name]`", inline=False)
+        if is_admin:
+            embed.add_field(name="⚙️ Admin", value="`!reset`, `!cache`, `!sync`, `!reload`, `!grantxp [amount] [@members]`, `!economy`, `!metrics`, `!profiler`", inline=False)
+        return embed
 
     @commands.command(name="reset")
     @commands.has_permissions(administrator=True)
     async def reset_data(self, ctx):
-        player_data.clear()
-        save_json(DB_FILE, player_data)
+        reset_players()
         await ctx.send("🧹 **SYSTEM RESET**.")
 
+    @commands.command(name="sync")
+    @commands.has_permissions(administrator=True)
+    async def sync_commands(self, ctx):
+        """Publish the slash commands (/item, /choose, /recipes) to Discord."""
+        synced = await self.bot.tree.sync()
+        await ctx.send(f"🔄 Synced **{len(synced)}** slash commands.")
+
+    @commands.command(name="reload")
+    @commands.has_permissions(administrator=True)
+    async def reload_content(self, ctx, *names: str):
+        """Reload items/effects/recipes/pathways/loot from disk (default: whatever changed, `all` for everything)."""
+        if "all" in names:
+            names = list(content.SOURCES)
+        unknown = [n for n in names if n not in content.SOURCES]
+        if unknown:
+            return await ctx.send(f"❓ Unknown content: {', '.join(unknown)}. Choose from {', '.join(content.SOURCES)} or `all`.")
+        try:
+            reloaded = await content.reload(names or None)
+        except content.ContentError as e:
+            message, reloaded = e.args
+            ok = f"🔄 Reloaded {', '.join(reloaded)}.\n" if reloaded else ""
+            return await ctx.send(f"{ok}❌ Rejected, keeping the current version: {message}")
+        if not reloaded:
+            return await ctx.send("✅ Content is already up to date.")
+        await ctx.send(f"🔄 Reloaded {', '.join(reloaded)}.")
+
+    @commands.command(name="grantxp")
+    @commands.has_permissions(administrator=True)
+    async def grant_xp_command(self, ctx, amount: int, members: commands.Greedy[discord.Member] = None):
+        """Give XP to the mentioned members, or to everyone in the server."""
+        if amount <= 0:
+            return await ctx.send("⚠️ The amount must be positive.")
+        if members:
+            targets = members
+        else:
+            everyone = await guild_members(ctx.guild)
+            if everyone is None:
+                return await ctx.send("❌ Couldn't fetch this server's member list. Mention the members to grant XP to instead.")
+            targets = [m for m in everyone if not m.bot]
+        if not targets:
+            return await ctx.send("⚠️ Nobody to grant XP to.")
+        granted, leveled, stale = await grant_xp([m.id for m in targets], amount)
+        if not granted and not stale:
+            return await ctx.send("⚠️ None of them has a profile yet, no XP was granted.")
+        msg = f"✨ Granted **{amount} XP** to {len(granted)} player{'s' if len(granted) != 1 else ''}."
+        if leveled:
+            msg += f"\n🎊 {len(leveled)} leveled up."
+        if stale:
+            msg += f"\n⚠️ {len(stale)} were being changed elsewhere and got nothing. Mention them to try again."
+        await ctx.send(msg)
+
+    @commands.command(name="cache")
+    @commands.has_permissions(administrator=True)
+    async def cache_stats(self, ctx):
+        stats = player_data.stats()
+        embed = discord.Embed(title="🗄️ Player Cache", color=0x34495E)
+        embed.add_field(name="Resident", value=f"{stats['size']} / {stats['maxsize'] or '∞'}")
+        embed.add_field(name="Hit rate", value=f"{stats['hit_rate']:.1%}")
+        embed.add_field(name="Hits / Misses", value=f"{stats['hits']} / {stats['misses']}")
+        embed.add_field(name="Evictions", value=stats['evictions'])
+        renders = render_cache.stats()
+        embed.add_field(name="🖼️ Render cache", value=f"{renders['size']} replies, {renders['hit_rate']:.1%} hits ({renders['hits']} / {renders['misses']})", inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.command(name="metrics")
+    @commands.has_permissions(administrator=True)
+    async def show_metrics(self, ctx):
+        """Slowest commands, error and cooldown counts, and flush timings."""
+        if not metrics.enabled:
+            return await ctx.send("📊 Metrics are off. Set `METRICS_ENABLED=1` to collect them.")
+        embed = discord.Embed(title="📊 Metrics", color=0x34495E)
+        commands_seen = metrics.by_label("bot_command_seconds")
+        lines = []
+        for name, h in sorted(commands_seen.items(), key=lambda kv: -kv[1].sum)[:12]:
+            errors = metrics.counter("bot_command_errors_total", (("command", name),))
+            lines.append(f"`{name}` ×{h.count}: mean {h.sum / h.count * 1000:.1f} ms, p95 ≤ {h.quantile(0.95) * 1000:g} ms"
+                         + (f", ❌ {errors}" if errors else ""))
+        embed.add_field(name="⏱️ Commands (by total time)", value="\n".join(lines) or "None yet.", inline=False)
+        views = metrics.by_label("bot_view_seconds")
+        if views:
+            embed.add_field(name="🔘 Views", value="\n".join(f"`{name}` ×{h.count}: mean {h.sum / h.count * 1000:.1f} ms" for name, h in views.items()), inline=False)
+        rejections = {labels[0][1]: n for (name, labels), n in metrics.counters.items() if name == "bot_cooldown_rejections_total"}
+        embed.add_field(name="⏳ Cooldown rejections", value=", ".join(f"{k}: {v}" for k, v in rejections.items()) or "None", inline=False)
+        flushes = metrics.by_label("bot_flush_seconds")
+        payload = metrics.histogram("bot_flush_payload_bytes")
+        if flushes:
+            value = "\n".join(f"{phase}: ×{h.count}, mean {h.sum / h.count * 1000:.1f} ms" for phase, h in flushes.items())
+            if payload and payload.count:
+                value += f"\nmean payload {payload.sum / payload.count / 1024:.0f} KiB, {metrics.counter('bot_flush_records_total')} records written"
+            embed.add_field(name="💾 Flushes", value=value, inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.command(name="profiler")
+    @commands.has_permissions(administrator=True)
+    async def profiler_command(self, ctx, action: str = None, *args: str):
+        """Profile commands: on <command...> | rate <0-1> | off | dump | reset"""
+        action = (action or "").lower()
+        if action == "on":
+            unknown = [a for a in args if not self.bot.get_command(a)]
+            if not args or unknown:
+                return await ctx.send(f"❓ Unknown command: {', '.join(unknown)}." if unknown else "❓ Usage: `!profiler on <command...>`")
+            profiler.commands.update(self.bot.get_command(a).qualified_name for a in args)
+        elif action == "rate":
+            try: rate = float(args[0])
+            except (IndexError, ValueError): return await ctx.send("❓ Usage: `!profiler rate <0-1>`")
+            profiler.rate = min(1.0, max(0.0, rate))
+        elif action == "off":
+            profiler.commands.clear()
+            profiler.rate = 0.0
+        elif action == "reset":
+            profiler.reset()
+        elif action == "dump":
+            paths = profiler.dump()
+            if not paths:
+                return await ctx.send("📭 Nothing profiled yet.")
+            top = profiler.top(8)
+            return await ctx.send(f"💾 Wrote `{paths[0]}` and `{paths[1]}`.\n```\n{top[:1800]}\n```")
+        elif action:
+            return await ctx.send("❓ Usage: `!profiler [on <command...> | rate <0-1> | off | dump | reset]`")
+
+        targets = ", ".join(sorted(profiler.commands)) or "none"
+        sampled = ", ".join(f"{name} ×{n}" for name, n in sorted(profiler.samples.items())) or "nothing yet"
+        await ctx.send(f"🔬 **Profiler** {'on' if profiler.active else 'off'}: commands {targets}, sample rate {profiler.rate:g}\n"
+                       f"Profiled {sampled} ({profiler.skipped} skipped while busy).")
+
 async def setup(bot):
     await bot.add_cog(Basic(bot))
@@ -1,55 +1,55 @@
 import discord
 from discord.ext import commands
-from datetime import datetime
+import asyncio
 import random
-from config import DB_FILE
-from data_manager import get_player, save_json, player_data, get_npc
-from utils import check_cooldown, format_timedelta, format_currency, gain_xp
+import rewards
+from data_manager import get_player, get_npc, add_to_npc, all_players
+from loot import loot_tables
+from transactions import player_tx
+import cooldowns
+from utils import format_timedelta, format_currency, gain_xp, retry_stale
 
 class Economy(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
     @commands.command(name="work")
+    @retry_stale
     async def work(self, ctx):
-        player = get_player(ctx.author.id)
-        can_run, rem = check_cooldown(player, "last_work", 1)
-        if not can_run: return await ctx.send(f"⏳ **Cooldown:** Wait **{format_timedelta(rem)}**.")
-        reward = random.randint(10, 20)
-        player["balance"] += reward
-        xp_gain = 5
-        leveled, new_lvl = gain_xp(player, xp_gain)
-        player["last_work"] = datetime.now().isoformat()
-        save_json(DB_FILE, player_data)
+        async with player_tx(ctx.author.id) as player:
+            can_run, rem = cooldowns.check(player, "work")
+            if not can_run: return await ctx.send(f"⏳ **Cooldown:** Wait **{format_timedelta(rem)}**.")
+            reward, xp_gain = rewards.work(random)
+            player["balance"] += reward
+            leveled, new_lvl = gain_xp(player, xp_gain)
+            cooldowns.stamp(player, "work")
         
-        msg = f"💼 Earned {format_currency(reward)} and **+{xp_gain} XP**."
-        if leveled:
-            msg += f"\n🎊 **LEVEL UP!** You are now level **{new_lvl}**!"
+            msg = f"💼 Earned {format_currency(reward)} and **+{xp_gain} XP**."
+            if leveled:
+                msg += f"\n🎊 **LEVEL UP!** You are now level **{new_lvl}**!"
         await ctx.send(msg)
 
     @commands.command(name="daily")
+    @retry_stale
     async def daily(self, ctx):
-        player = get_player(ctx.author.id)
-        can_run, rem = check_cooldown(player, "last_daily", 24)
-        if not can_run: return await ctx.send(f"⏳ **Cooldown:** Wait **{format_timedelta(rem)}**.")
-        player["balance"] += 120
+        async with player_tx(ctx.author.id) as player:
+            can_run, rem = cooldowns.check(player, "daily")
+            if not can_run: return await ctx.send(f"⏳ **Cooldown:** Wait **{format_timedelta(rem)}**.")
+            player["balance"] += rewards.DAILY_REWARD
         
-        xp_gain = 50
-        leveled, new_lvl = gain_xp(player, xp_gain)
-        player["acting_xp"] = min(player.get("acting_max_xp", 200), player.get("acting_xp", 0) + 15)
+            xp_gain = rewards.DAILY_XP
+            leveled, new_lvl = gain_xp(player, xp_gain)
+            player["acting_xp"] = min(player.get("acting_max_xp", 200), player.get("acting_xp", 0) + rewards.DAILY_ACTING)
         
-        # We need access to items_db to give random item
-        from data_manager import items_db
-        item_id = random.choice(list(items_db.keys()))
-        player["inventory"].append(item_id)
-        item_name = items_db[item_id]["name"]
+            drops = loot_tables.roll("daily", player)
+            for item_id in drops:
+                player["inventory"].add(item_id)
         
-        player["last_daily"] = datetime.now().isoformat()
-        save_json(DB_FILE, player_data)
+            cooldowns.stamp(player, "daily")
         
-        msg = f"🎁 **Daily Rewards Claimed!**\n💰 +120 Pence\n🆙 +{xp_gain} XP\n🎭 +15 Acting XP\n🎒 Found: **{item_name}**"
-        if leveled:
-            msg += f"\n\n🎊 **LEVEL UP!** You are now level **{new_lvl}**!"
+            msg = f"🎁 **Daily Rewards Claimed!**\n💰 +{rewards.DAILY_REWARD} Pence\n🆙 +{xp_gain} XP\n🎭 +{rewards.DAILY_ACTING} Acting XP\n🎒 Found: {loot_tables.describe(drops)}"
+            if leveled:
+                msg += f"\n\n🎊 **LEVEL UP!** You are now level **{new_lvl}**!"
         await ctx.send(msg)
 
     @commands.command(name="balance")
@@ -58,29 +58,34 @@ class Economy(commands.Cog):
         await ctx.send(f"💰 Balance: {format_currency(p['balance'])}")
 
     @commands.command(name="casino")
+    @retry_stale
     async def casino(self, ctx, amount: str = None):
-        player = get_player(ctx.author.id)
-        will = get_npc("will_auceptin")
         if not amount: return await ctx.send("❓ Amount?")
-        try: bet = int(amount) if amount.lower() != "allin" else player["balance"]
-        except: return await ctx.send("❌ Error.")
-        if bet <= 0 or player["balance"] < bet: return await ctx.send("❌ Funds?")
-        
-        p_roll, w_roll = random.randint(2, 12), random.randint(2, 12)
+        async with player_tx(ctx.author.id) as player:
+            try: bet = int(amount) if amount.lower() != "allin" else player["balance"]
+            except: bet = None
+            funded = bet is not None and 0 < bet <= player["balance"]
+            if funded:
+                p_roll, w_roll = rewards.casino(random)
+                if p_roll > w_roll:
+                    player["balance"] += bet
+                elif p_roll < w_roll:
+                    player["balance"] -= bet
+        if bet is None: return await ctx.send("❌ Error.")
+        if not funded: return await ctx.send("❌ Funds?")
+        if p_roll < w_roll:
+            # Will's winnings go on once the bet has been taken
+            await add_to_npc("will_auceptin", bankroll=bet, wins=1)
+
         embed = discord.Embed(title="🎰 Will Auceptin's Casino", color=0xF1C40F)
         embed.add_field(name="You", value=f"🎲 **{p_roll}**")
         embed.add_field(name="Will", value=f"🎲 **{w_roll}**")
 
         if p_roll > w_roll:
-            player["balance"] += bet
             embed.description = f"🎉 Won {format_currency(bet)}!"
         elif p_roll < w_roll:
-            player["balance"] -= bet
-            will["bankroll"] += bet
-            will["wins"] += 1
             embed.description = f"💀 Lost {format_currency(bet)}."
         else: embed.description = "🤝 Draw."
-        save_json(DB_FILE, player_data)
         await ctx.send(embed=embed)
 
     @commands.command(name="will", aliases=["willinfo"])
@@ -91,5 +96,30 @@ class Economy(commands.Cog):
         embed.add_field(name="🏆 Wins", value=will["wins"])
         await ctx.send(embed=embed)
 
+    @commands.command(name="economy")
+    @commands.has_permissions(administrator=True)
+    async def economy_report(self, ctx):
+        """Currency supply, wealth distribution and per-pathway figures."""
+        # Imported here so NumPy stays off the startup path
+        import analytics
+        if analytics.np is None:
+            return await ctx.send("❌ Economy analytics need NumPy installed on the bot host.")
+        will = get_npc("will_auceptin")
+        # all_players() walks the live cache, so list it here rather than in the thread
+        players = list(all_players())
+        report = await asyncio.to_thread(analytics.analyze, players, {"will_auceptin": will})
+        b, supply = report["balance"], report["supply"]
+        embed = discord.Embed(title="📈 State of the Economy", color=0x2ECC71)
+        embed.add_field(name="💰 Supply", value=f"{format_currency(supply['total'])}\nWill holds {supply['will_auceptin'] / supply['total']:.1%}" if supply["total"] else "Nothing yet.", inline=False)
+        embed.add_field(name="⚖️ Balances", value=f"Median {format_currency(int(b['p50']))}\np90 {format_currency(int(b['p90']))}\nGini **{b['gini']:.3f}**, top 1% hold **{b['top_1pct_share']:.1%}**", inline=False)
+        embed.add_field(name="🆙 Level", value=f"mean {report['level']['mean']:.1f}, max {report['level']['max']}")
+        embed.add_field(name="🧠 Sanity", value=f"mean {report['sanity']['mean']:.0f}%, {report['sanity']['broken']} broken")
+        recent = report["last_24h"]
+        embed.add_field(name="🕒 Last 24h", value=f"{recent['daily']} dailies ({format_currency(recent['daily_minted'])} minted), {recent['work']} workers, {recent['expedition']} expeditions", inline=False)
+        top = sorted(report["pathways"].items(), key=lambda kv: -kv[1]["players"])[:8]
+        embed.add_field(name="🌌 Pathways", value="\n".join(f"**{name}**: {p['players']} players, mean level {p['mean_level']:.1f}" for name, p in top) or "None", inline=False)
+        embed.set_footer(text=f"{report['players']} players")
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(Economy(bot))
@@ -1,8 +1,19 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
-from config import DB_FILE
+from typing import Optional
+from crafting import recipe_book
 from data_manager import get_player, items_db, effects_db, recipes_db
-from utils import craft_item
+from transactions import player_tx
+from render_cache import render_cache
+from search import item_index, recipe_index, normalize
+from utils import craft_item, item_name, retry_stale
+
+# Crafting commands and the recipe category each one works from
+CRAFT_STATIONS = {
+    "alchemy": ("potions", "⚗️", "brew"),
+    "forge": ("artifacts", "🔨", "forge"),
+}
 
 class Inventory(commands.Cog):
     def __init__(self, bot):
@@ -12,25 +23,53 @@ class Inventory(commands.Cog):
     async def inventory(self, ctx):
         player = get_player(ctx.author.id)
         if not player["inventory"]: return await ctx.send("🎒 Empty inventory.")
-        counts = {}
-        for item_id in player["inventory"]:
-            name = items_db.get(item_id, {}).get("name", item_id)
-            counts[name] = counts.get(name, 0) + 1
-        inv_str = "\n".join([f"• {name} (x{count})" for name, count in counts.items()])
+        inv_str = "\n".join([f"• {item_name(item_id)} (x{count})" for item_id, count in player["inventory"].items()])
         await ctx.send(f"🎒 **{ctx.author.display_name}'s Inventory:**\n{inv_str}")
 
-    @commands.command(name="item")
+    @commands.hybrid_command(name="item")
     async def item_info(self, ctx, *, name: str):
-        item_id = next((k for k, v in items_db.items() if v["name"].lower() == name.lower()), None)
-        if not item_id: return await ctx.send("❌ Item not found.")
+        """Look up a mystical item."""
+        await ctx.send(**render_cache.get(("item", normalize(name)), lambda: self.build_item(name)))
+
+    def build_item(self, name):
+        item_id = item_index.find(name)
+        if not item_id:
+            suggestions = item_index.suggest(name)
+            if suggestions:
+                return {"content": f"❌ Item not found. Did you mean {', '.join(f'**{item_index.name(k)}**' for k in suggestions)}?"}
+            return {"content": "❌ Item not found."}
         item = items_db[item_id]
         embed = discord.Embed(title=item["name"], description=item["description"], color=0xE91E63)
         if item.get("effects"):
             embed.add_field(name="Effects", value="\n".join([f"✨ {effects_db.get(e, {}).get('name', e)}" for e in item["effects"]]), inline=False)
-        await ctx.send(embed=embed)
+        return {"embed": embed}
+
+    @item_info.autocomplete("name")
+    async def item_name_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=item_index.name(k), value=item_index.name(k)) for k in item_index.complete(current)]
+
+    @commands.hybrid_command(name="recipes")
+    async def show_recipes(self, ctx, *, name: str = None):
+        """Browse the Book of Recipes, or read a single recipe."""
+        if name:
+            return await ctx.send(**render_cache.get(("recipe", normalize(name)), lambda: self.build_recipe(name)))
+        await ctx.send(**render_cache.get(("recipes",), self.build_recipes))
 
-    @commands.command(name="recipes")
-    async def show_recipes(self, ctx):
+    def build_recipe(self, name):
+        key = recipe_index.find(name)
+        if not key:
+            suggestions = recipe_index.suggest(name)
+            if suggestions:
+                return {"content": f"❌ Recipe not found. Did you mean {', '.join(f'**{recipe_index.name(k)}**' for k in suggestions)}?"}
+            return {"content": "❌ Recipe not found."}
+        cat, r_id = key
+        r = recipes_db[cat][r_id]
+        embed = discord.Embed(title=f"📜 {r['name']}", description=r.get("description", ""), color=0x795548)
+        embed.add_field(name="Ingredients", value="\n".join([f"• {count}x {items_db.get(i, {}).get('name', i)}" for i, count in r['ingredients'].items()]), inline=False)
+        embed.set_footer(text=f"{cat.capitalize()} • {r_id}")
+        return {"embed": embed}
+
+    def build_recipes(self):
         embed = discord.Embed(title="📜 Book of Recipes", color=0x795548)
         for cat, items in recipes_db.items():
             text = ""
@@ -38,11 +77,53 @@ class Inventory(commands.Cog):
                 ings = ", ".join([f"{count}x {items_db.get(i, {}).get('name', i)}" for i, count in r['ingredients'].items()])
                 text += f"• **{r['name']}** (`{r_id}`): {ings}\n"
             embed.add_field(name=cat.capitalize(), value=text or "None", inline=False)
-        await ctx.send(embed=embed)
+        return {"embed": embed}
+
+    @show_recipes.autocomplete("name")
+    async def recipe_name_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=recipe_index.name(k), value=recipe_index.name(k)) for k in recipe_index.complete(current)]
+
+    @commands.hybrid_command(name="alchemy")
+    async def alchemy(self, ctx, count: Optional[int] = 1, *, name: str = None):
+        """Brew a potion, or see which potions you can brew."""
+        await self.craft(ctx, "alchemy", count, name)
+
+    @commands.hybrid_command(name="forge")
+    async def forge(self, ctx, count: Optional[int] = 1, *, name: str = None):
+        """Forge an artifact, or see which artifacts you can forge."""
+        await self.craft(ctx, "forge", count, name)
+
+    @retry_stale
+    async def craft(self, ctx, station, count, name):
+        category, icon, verb = CRAFT_STATIONS[station]
+        player = get_player(ctx.author.id)
+
+        if not name:
+            ready = recipe_book.craftable(player["inventory"], category)
+            if not ready:
+                return await ctx.send(f"{icon} You have nothing to {verb}. Check `!recipes` for ingredients.")
+            lines = "\n".join([f"• **{recipe_book.get(key)['name']}** (x{times})" for key, times in ready])
+            return await ctx.send(f"{icon} **You can {verb}:**\n{lines}\nUse `!{station} [amount] [name]`.")
+
+        key = recipe_index.find(name)
+        if not key or key[0] != category:
+            return await ctx.send(f"❌ No such recipe to {verb}.")
+        if count < 1:
+            return await ctx.send("❌ Amount must be at least 1.")
+
+        async with player_tx(ctx.author.id) as player:
+            success, result = craft_item(player, category, key[1], count)
+            if not success:
+                return await ctx.send(f"❌ {result}")
+        await ctx.send(f"{icon} You {verb} **{count}x {result['name']}**.")
+
+    @alchemy.autocomplete("name")
+    async def alchemy_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=recipe_index.name(k), value=recipe_index.name(k)) for k in recipe_index.complete(current) if k[0] == "potions"]
 
-    # Note: Alchemy and Forge were mentioned in help but not implemented in the original file view I had. 
-    # If they were there, I would add them here. For now, I'll respect the help command which listed them
-    # but the implementation wasn't visible in the snippets I saw or was missing.
+    @forge.autocomplete("name")
+    async def forge_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=recipe_index.name(k), value=recipe_index.name(k)) for k in recipe_index.complete(current) if k[0] == "artifacts"]
 
 async def setup(bot):
     await bot.add_cog(Inventory(bot))
@@ -1,8 +1,14 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
-from config import PATHWAY_STATS, COC_STATS, STAT_NAMES, DB_FILE
-from data_manager import get_player, pathways_db, save_json, player_data
-from utils import format_currency
+from config import PATHWAY_STATS, COC_STATS, STAT_NAMES
+from data_manager import get_player, pathways_db, leaderboards
+from leaderboard import BOARDS
+from metrics import metrics
+from render_cache import render_cache
+from search import pathway_index
+from transactions import player_tx
+from utils import format_currency, guild_members, retry_stale
 
 class Profile(commands.Cog):
     def __init__(self, bot):
@@ -13,39 +19,56 @@ class Profile(commands.Cog):
         """Displays the list of loaded pathways."""
         if not pathways_db:
             return await ctx.send("❌ No pathways loaded.")
-        
+        await ctx.send(**render_cache.get(("pathways",), self.build_pathways))
+
+    def build_pathways(self):
         description = "\n".join([f"• **{pw['name']}** (S9: {pw['sequences']['9']['name']})" for pw in pathways_db.values()])
-        embed = discord.Embed(title="🌌 The Divine Pathways", description=description, color=0x3498DB)
-        await ctx.send(embed=embed)
+        return {"embed": discord.Embed(title="🌌 The Divine Pathways", description=description, color=0x3498DB)}
 
-    @commands.command(name="choose")
+    @commands.hybrid_command(name="choose")
+    @retry_stale
     async def choose_pathway(self, ctx, *, name: str = None):
+        """Choose the pathway you will walk."""
         player = get_player(ctx.author.id)
         if player["pathway"]: return await ctx.send("❌ Destiny is already set.")
         if name is None: return await ctx.send("❓ Usage: `!choose [pathway name]`")
         
-        choice = next((pw for pw in pathways_db.values() if pw["name"].lower() == name.lower()), None)
+        pathway_name = pathway_index.find(name)
+        choice = pathways_db.get(pathway_name) if pathway_name else None
         if choice:
-            player["pathway"] = choice["name"]
-            if player.get("affiliation") == "Neutral":
-                player["affiliation"] = "Unofficial Beyonder"
-            player["acting_name"] = choice["sequences"]["9"]["name"]
-            player["sequence"] = 9
-            player["acting_mastery"] = 0
-            
-            # Apply Pathway Bonuses
-            bonuses = PATHWAY_STATS.get(choice["name"], {})
-            for stat, bonus in bonuses.items():
-                player["stats"][stat] += bonus
-                
-            save_json(DB_FILE, player_data)
+            async with player_tx(ctx.author.id) as player:
+                # Checked again under the lock: two !choose at once must not both apply bonuses
+                if player["pathway"]: return await ctx.send("❌ Destiny is already set.")
+                player["pathway"] = choice["name"]
+                if player.get("affiliation") == "Neutral":
+                    player["affiliation"] = "Unofficial Beyonder"
+                player["acting_name"] = choice["sequences"]["9"]["name"]
+                player["sequence"] = 9
+                player["acting_mastery"] = 0
+
+                # Apply Pathway Bonuses
+                bonuses = PATHWAY_STATS.get(choice["name"], {})
+                for stat, bonus in bonuses.items():
+                    player["stats"][stat] += bonus
+
             await ctx.send(f"🔮 Welcome, **{player['acting_name']}** (Pathway: {player['pathway']}).\nYour characteristics have been enhanced!")
-        else: await ctx.send("❌ Pathway not found.")
+        else:
+            suggestions = pathway_index.suggest(name)
+            if suggestions:
+                return await ctx.send(f"❌ Pathway not found. Did you mean {', '.join(f'**{s}**' for s in suggestions)}?")
+            await ctx.send("❌ Pathway not found.")
+
+    @choose_pathway.autocomplete("name")
+    async def pathway_name_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=n, value=n) for n in pathway_index.complete(current)]
 
     @commands.command(name="profile", aliases=["profil"])
     async def profile(self, ctx, member: discord.Member = None):
         target = member or ctx.author
-        player = get_player(target.id)
+        # Looking someone up shouldn't create a record for them
+        player = get_player(target.id, create=target.id == ctx.author.id)
+        if player is None:
+            return await ctx.send(f"👤 **{target.display_name}** has not begun their journey yet.")
         color = 0x2ECC71 if player["pathway"] else 0x95A5A6
         embed = discord.Embed(title=f"👤 {target.display_name}", color=color)
         if target.avatar: embed.set_thumbnail(url=target.avatar.url)
@@ -97,6 +120,59 @@ class Profile(commands.Cog):
         
         await ctx.send(embed=embed)
 
+    @commands.command(name="leaderboard", aliases=["lb", "top"])
+    async def leaderboard(self, ctx, board: str = "balance", scope: str = None):
+        """Top players by balance, level, sequence or mastery, in this server or `global`."""
+        board = board.lower()
+        if board not in BOARDS:
+            return await ctx.send(f"❓ Unknown leaderboard. Choose from: {', '.join(BOARDS)}.")
+        is_global = ctx.guild is None or (scope or "").lower() == "global"
+        fallback = False
+        if not is_global and not leaderboards.has_guild(ctx.guild.id):
+            # A guild's boards are kept from then on, so only ever build them from the full member list
+            members = await guild_members(ctx.guild)
+            if members is None:
+                is_global = fallback = True
+            else:
+                leaderboards.board(board, ctx.guild.id, (m.id for m in members if not m.bot))
+        index = leaderboards.board(board) if is_global else leaderboards.board(board, ctx.guild.id)
+
+        lines = []
+        for rank, user_id in enumerate(index.top(10), 1):
+            member = (ctx.guild and ctx.guild.get_member(int(user_id))) or self.bot.get_user(int(user_id))
+            name = member.display_name if member else f"Unknown ({user_id})"
+            lines.append(f"**{rank}.** {name}: {self.board_value(board, index.entries[user_id])}")
+
+        where = "🌍 Global" if is_global else f"🏰 {ctx.guild.name}"
+        embed = discord.Embed(title=f"🏆 {board.capitalize()} Leaderboard ({where})", color=0xF1C40F)
+        embed.description = "\n".join(lines) if lines else "Nobody is ranked yet."
+        if fallback:
+            embed.description += "\n\n⚠️ This server's member list isn't available, showing the global board."
+        author_id = str(ctx.author.id)
+        rank = index.rank(author_id)
+        if rank:
+            embed.set_footer(text=f"Your rank: #{rank} of {len(index)} ({self.board_value(board, index.entries[author_id], plain=True)})")
+        await ctx.send(embed=embed)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        leaderboards.join(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        leaderboards.leave(member.guild.id, member.id)
+
+    @staticmethod
+    def board_value(board, key, plain=False):
+        if board == "balance":
+            value = format_currency(-key[0])
+            return value.replace("**", "") if plain else value
+        if board == "level":
+            return f"Level {-key[0]}"
+        if board == "sequence":
+            return f"Sequence {key[0]}"
+        return f"{-key[0]} acting rituals"
+
     @commands.command(name="stats", aliases=["stat"])
     async def assign_stat_menu(self, ctx):
         """Open an interactive menu to assign stat points."""
@@ -138,20 +214,22 @@ class StatView(discord.ui.View):
     def create_stat_button(self, stat_name):
         button = discord.ui.Button(label=stat_name, style=discord.ButtonStyle.primary)
         
+        @metrics.timed_view("stats")
+        @retry_stale
         async def callback(interaction: discord.Interaction):
             if interaction.user.id != self.user_id:
                 return await interaction.response.send_message("❌ This is not your menu.", ephemeral=True)
             
-            player = get_player(self.user_id)
-            if player["stat_points"] <= 0:
-                return await interaction.response.edit_message(view=None)
-            
-            player["stats"][stat_name] += 1
-            player["stat_points"] -= 1
+            async with player_tx(self.user_id) as player:
+                if player["stat_points"] <= 0:
+                    return await interaction.response.edit_message(view=None)
+
+                player["stats"][stat_name] += 1
+                player["stat_points"] -= 1
+                embed = self.create_embed(player)
+
             self.history.append(stat_name)
-            save_json(DB_FILE, player_data)
-            
-            await interaction.response.edit_message(embed=self.create_embed(player), view=self)
+            await interaction.response.edit_message(embed=embed, view=self)
         
         button.callback = callback
         return button
@@ -159,6 +237,8 @@ class StatView(discord.ui.View):
     def create_undo_button(self):
         button = discord.ui.Button(label="↩️ Undo", style=discord.ButtonStyle.danger)
         
+        @metrics.timed_view("stats_undo")
+        @retry_stale
         async def callback(interaction: discord.Interaction):
             if interaction.user.id != self.user_id:
                 return await interaction.response.send_message("❌ This is not your menu.", ephemeral=True)
@@ -166,13 +246,14 @@ class StatView(discord.ui.View):
             if not self.history:
                 return await interaction.response.send_message("❌ Nothing to undo.", ephemeral=True)
             
-            player = get_player(self.user_id)
-            last_stat = self.history.pop()
-            player["stats"][last_stat] -= 1
-            player["stat_points"] += 1
-            save_json(DB_FILE, player_data)
-            
-            await interaction.response.edit_message(embed=self.create_embed(player), view=self)
+            async with player_tx(self.user_id) as player:
+                last_stat = self.history[-1]
+                player["stats"][last_stat] -= 1
+                player["stat_points"] += 1
+                embed = self.create_embed(player)
+
+            self.history.pop()
+            await interaction.response.edit_message(embed=embed, view=self)
             
         button.callback = callback
         return button
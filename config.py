@@ -4,13 +4,77 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
+# Server leaderboards and !grantxp without mentions need whole member lists,
+# which takes the privileged members intent (enable it in the developer
+# portal as well). Without it the leaderboard shows the global board and
+# !grantxp only takes mentions.
+MEMBERS_INTENT = os.getenv('MEMBERS_INTENT', '0') == '1'
 
 # File Paths
-DB_FILE = "data.json"
+DB_FILE = os.getenv('DB_FILE', "data.json")
+SQLITE_FILE = os.getenv('SQLITE_FILE', "data.db")
+JOURNAL_FILE = os.getenv('JOURNAL_FILE', "data.journal")
 ITEMS_FILE = "items.json"
 EFFECTS_FILE = "effects.json"
 RECIPES_FILE = "recipes.json"
+LOOT_FILE = "loot_tables.json"
 PATHWAYS_DIR = "pathways"
+CONTENT_BUNDLE = "content.bundle"
+
+# Persistence
+# "json" keeps everyone in DB_FILE, "sqlite" stores one row per player in SQLITE_FILE.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json')
+# Player changes are written behind: saves are coalesced and flushed every
+# SAVE_INTERVAL seconds, or sooner once SAVE_DIRTY_THRESHOLD players changed.
+SAVE_INTERVAL = int(os.getenv('SAVE_INTERVAL', 30))
+SAVE_DIRTY_THRESHOLD = int(os.getenv('SAVE_DIRTY_THRESHOLD', 50))
+# Every change is also appended to JOURNAL_FILE so nothing is lost between
+# flushes; the journal is folded into a fresh snapshot on each flush, or
+# early once it grows past JOURNAL_MAX_BYTES. With JOURNAL_FSYNC appends are
+# fsynced in groups from a background thread (see journal.py).
+JOURNAL_ENABLED = os.getenv('JOURNAL_ENABLED', '1') == '1'
+JOURNAL_FSYNC = os.getenv('JOURNAL_FSYNC', '1') == '1'
+JOURNAL_MAX_BYTES = int(os.getenv('JOURNAL_MAX_BYTES', 8 * 1024 * 1024))
+# Most players resident in memory at once (0 = no limit). Only applies to
+# stores that can load a single player, i.e. sqlite: the json store reads
+# everyone in and never evicts, so with it there is no cap at all (the bot
+# warns about this at startup).
+PLAYER_CACHE_SIZE = int(os.getenv('PLAYER_CACHE_SIZE', 10000))
+
+# Sharding. With SHARD_COUNT set the bot runs as an AutoShardedBot serving
+# the shards in SHARD_IDS (e.g. "0-3,6"; empty = all of them) and several such
+# workers, started by `python sharding.py`, share the sqlite store. Each
+# transaction then writes its records through at once, and every worker drops
+# cached players another one wrote, checking the store's change log at the
+# start of each transaction and every SYNC_INTERVAL seconds. Change log
+# entries older than CHANGE_LOG_RETENTION seconds are pruned.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', 0))
+SHARD_IDS = os.getenv('SHARD_IDS', '')
+WORKER_ID = os.getenv('WORKER_ID', '')
+SYNC_INTERVAL = float(os.getenv('SYNC_INTERVAL', 1))
+CHANGE_LOG_RETENTION = int(os.getenv('CHANGE_LOG_RETENTION', 3600))
+# Seconds a sqlite write waits for another process's write to finish
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 10))
+# Times a command whose write was refused as stale is run before giving up
+STALE_RETRIES = int(os.getenv('STALE_RETRIES', 3))
+
+# Content files are checked for changes every CONTENT_WATCH_INTERVAL seconds
+# and reloaded in place (0 = only reload through the !reload command).
+CONTENT_WATCH_INTERVAL = int(os.getenv('CONTENT_WATCH_INTERVAL', 5))
+
+# Command, view and flush timings for the admin !metrics command. With
+# METRICS_PORT set they are also served in the Prometheus text format on
+# METRICS_HOST:METRICS_PORT (0 = no HTTP endpoint).
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+
+# A cold start (process start to gateway ready) slower than this many
+# seconds is flagged in the startup report (0 = no target)
+STARTUP_TARGET = float(os.getenv('STARTUP_TARGET', 10))
+
+# Where !profiler dump writes its .prof and .folded files
+PROFILE_DIR = os.getenv('PROFILE_DIR', "profiles")
 
 # Stat config
 COC_STATS = ["STR", "CON", "SIZ", "DEX", "APP", "INT", "POW", "EDU"]
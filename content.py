@@ -0,0 +1,116 @@
+import asyncio
+from catalog import ContentError, load_content, read_source, signature, validate, check_references
+from config import CONTENT_WATCH_INTERVAL
+from data_manager import items_db, effects_db, recipes_db, pathways_db, loot_db
+
+# Loading and live reloading of the static content (items, effects, recipes,
+# pathways, loot tables). load() fills the catalogs at startup; until then
+# they're empty.
+#
+# Cogs hold on to the dicts from data_manager, so a reload never rebinds them:
+# the new file is read and validated (on its own and against the other
+# catalogs) off the event loop, then swapped into the existing dict with
+# clear() + update(). Nothing awaits in between, so no command ever sees a
+# half-loaded catalog. Modules with derived data (name indexes, recipe
+# book...) register with on_reload() to rebuild it.
+
+SOURCES = {
+    "items": items_db,
+    "effects": effects_db,
+    "recipes": recipes_db,
+    "pathways": pathways_db,
+    "loot": loot_db,
+}
+
+_listeners = []
+_lock = asyncio.Lock()
+
+def on_reload(callback):
+    """Registers callback(changed_names), called after every successful reload."""
+    _listeners.append(callback)
+    return callback
+
+_signatures = {}
+
+def changed_sources():
+    return [name for name in SOURCES if signature(name) != _signatures.get(name)]
+
+def _read_all():
+    # Stamped before reading, so a change made meanwhile is picked up later
+    stamps = {name: signature(name) for name in SOURCES}
+    return load_content(), stamps
+
+def _swap_in(catalogs):
+    for name, data in catalogs.items():
+        target = SOURCES[name]
+        target.clear()
+        target.update(data)
+    for callback in _listeners:
+        callback(set(catalogs))
+
+async def load():
+    """Reads every catalog off the event loop (from the bundle when it is up to date).
+
+    Raises ContentError, leaving the catalogs as they were, if the sources fail validation.
+    """
+    async with _lock:
+        catalogs, stamps = await asyncio.to_thread(_read_all)
+        _signatures.update(stamps)
+        _swap_in(catalogs)
+
+def _load(names):
+    # Runs in a worker thread: read and validate before touching live data
+    loaded, errors = {}, {}
+    for name in names:
+        stamp = signature(name)
+        try:
+            data = read_source(name)
+            validate(name, data)
+        except ContentError as e:
+            errors[name] = (str(e), stamp)
+        else:
+            loaded[name] = (data, stamp)
+    if loaded:
+        # The new files must still agree with everything they reference
+        merged = dict(SOURCES)
+        merged.update({name: data for name, (data, _) in loaded.items()})
+        problems = check_references(merged)
+        if problems:
+            message = f"{', '.join(loaded)} would break references: " + "; ".join(problems[:5])
+            for name, (_, stamp) in loaded.items():
+                errors[name] = (message, stamp)
+            loaded = {}
+    return loaded, errors
+
+async def reload(names=None):
+    """Reloads the given catalogs (default: those whose files changed). Returns the reloaded names."""
+    async with _lock:
+        names = changed_sources() if names is None else list(names)
+        if not names:
+            return []
+        loaded, errors = await asyncio.to_thread(_load, names)
+        for name, (_, stamp) in loaded.items():
+            _signatures[name] = stamp
+        if loaded:
+            _swap_in({name: data for name, (data, _) in loaded.items()})
+        if errors:
+            # Remember the broken version so the watcher doesn't retry it every interval
+            for name, (_, stamp) in errors.items():
+                _signatures[name] = stamp
+            raise ContentError("; ".join(dict.fromkeys(message for message, _ in errors.values())), list(loaded))
+        return list(loaded)
+
+async def watch_loop():
+    if CONTENT_WATCH_INTERVAL <= 0:
+        return
+    while True:
+        await asyncio.sleep(CONTENT_WATCH_INTERVAL)
+        try:
+            reloaded = await reload()
+            if reloaded:
+                print(f'🔄 Reloaded content: {", ".join(reloaded)}')
+        except ContentError as e:
+            message, reloaded = e.args
+            if reloaded:
+                print(f'🔄 Reloaded content: {", ".join(reloaded)}')
+            print(f'❌ Content reload rejected, keeping the current version. {message}')
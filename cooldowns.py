@@ -0,0 +1,131 @@
+import asyncio
+import heapq
+import time
+from datetime import timedelta
+from metrics import metrics
+from transactions import on_commit
+
+# Command cooldowns.
+#
+# Each cooldown is stored on the player as the UTC epoch second it was last
+# used (e.g. player["last_work"]). Running cooldowns that a player asked to
+# be reminded of are also kept in an expiry heap, so "who just came off
+# cooldown" is answered by popping the heap instead of scanning players;
+# that drives the opt-in ready reminders. Stamps are indexed when their
+# transaction commits, so a rolled back one never reminds anybody.
+
+COOLDOWNS = {
+    # name: (player field, duration in seconds)
+    "work": ("last_work", 1 * 3600),
+    "expedition": ("last_expedition", 3 * 3600),
+    "act": ("last_act", 12 * 3600),
+    "daily": ("last_daily", 24 * 3600),
+}
+
+def now():
+    return int(time.time())
+
+def remaining(player, name):
+    """Seconds left on a cooldown, 0 when ready."""
+    field, duration = COOLDOWNS[name]
+    last = player.get(field)
+    if last is None:
+        return 0
+    # If the clock was stepped back, count the cooldown as just started
+    # rather than leaving the player locked out for longer than it lasts.
+    elapsed = max(0, now() - last)
+    return max(0, duration - elapsed)
+
+def check(player, name):
+    """(True, 0) when the command can run, else (False, timedelta left)."""
+    left = remaining(player, name)
+    if not left: return True, 0
+    metrics.inc("bot_cooldown_rejections_total", (("cooldown", name),))
+    return False, timedelta(seconds=left)
+
+def ready_at(player, name):
+    field, duration = COOLDOWNS[name]
+    last = player.get(field)
+    return last + duration if last is not None else None
+
+
+class ExpiryIndex:
+    """Min-heap of (ready_at, user_id, name).
+
+    Re-stamping a cooldown pushes a new entry; the old one is skipped when
+    popped because it no longer matches `latest`.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.latest = {}
+
+    def push(self, user_id, name, when):
+        if self.latest.get((user_id, name)) == when:
+            return
+        self.latest[(user_id, name)] = when
+        heapq.heappush(self.heap, (when, user_id, name))
+
+    def next_due(self):
+        while self.heap and self.latest.get(self.heap[0][1:]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, at=None):
+        """Every (user_id, name) whose cooldown ended by `at` (default: now)."""
+        at = now() if at is None else at
+        due = []
+        while self.heap and self.heap[0][0] <= at:
+            when, user_id, name = heapq.heappop(self.heap)
+            if self.latest.get((user_id, name)) == when:
+                del self.latest[(user_id, name)]
+                due.append((user_id, name))
+        return due
+
+    def __len__(self):
+        return len(self.latest)
+
+expiry_index = ExpiryIndex()
+
+def stamp(player, name):
+    """Starts a cooldown now."""
+    field, _ = COOLDOWNS[name]
+    player[field] = now()
+
+def seed(records):
+    """Indexes the running cooldowns that these players asked to be reminded of."""
+    current = now()
+    for user_id, player in records.items():
+        for name in player.get("reminders", ()):
+            when = ready_at(player, name)
+            if when is not None and when > current:
+                expiry_index.push(str(user_id), name, when)
+
+# Stamps and `!remind on` are indexed once they're committed
+on_commit(seed)
+
+
+# --- Ready reminders ---
+REMINDER_TEXT = {
+    "work": "💼 You can `!work` again.",
+    "expedition": "🕵️ Your expedition party is rested. `!expedition` is ready!",
+    "act": "🎭 You can `!act` again.",
+    "daily": "🎁 Your `!daily` rewards are waiting.",
+}
+
+async def reminder_loop(bot, get_player):
+    await bot.wait_until_ready()
+    while True:
+        for user_id, name in expiry_index.pop_due():
+            player = get_player(user_id, create=False)
+            if not player or name not in player.get("reminders", []):
+                continue
+            try:
+                user = bot.get_user(int(user_id)) or await bot.fetch_user(int(user_id))
+                await user.send(REMINDER_TEXT[name])
+            except Exception as e:
+                # DMs closed or user gone; nothing to retry
+                print(f'⚠️ Could not send {name} reminder to {user_id}: {e}')
+        next_due = expiry_index.next_due()
+        # Wake up at the next expiry, but at least every minute for new stamps
+        await asyncio.sleep(max(1, min(60, next_due - now())) if next_due else 60)
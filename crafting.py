@@ -0,0 +1,123 @@
+from content import on_reload
+from data_manager import recipes_db, pathways_db
+
+# Recipe lookups that don't scan the recipe book.
+#
+# The book keeps a reverse index from each ingredient to the recipes using it,
+# so "what can I craft" only visits recipes that share an ingredient with the
+# inventory, and each of those is settled with one counter per ingredient.
+
+class RecipeBook:
+    def __init__(self, recipes):
+        self.rebuild(recipes)
+
+    def rebuild(self, recipes):
+        book, by_ingredient, products = {}, {}, {}
+        for category, entries in recipes.items():
+            for recipe_id, recipe in entries.items():
+                key = (category, recipe_id)
+                book[key] = recipe
+                # A crafted recipe lands in the inventory under its own id
+                products[recipe_id] = recipe["name"]
+                for item_id, count in recipe["ingredients"].items():
+                    by_ingredient.setdefault(item_id, []).append((key, count))
+        self.recipes, self.by_ingredient, self.products = book, by_ingredient, products
+
+    def get(self, key):
+        return self.recipes.get(key)
+
+    def uses(self, item_id):
+        """Recipes that need an item, as [(key, count)]."""
+        return self.by_ingredient.get(item_id, [])
+
+    def times(self, inventory, key):
+        """How many times the inventory covers a recipe."""
+        recipe = self.recipes.get(key)
+        if not recipe or not recipe["ingredients"]:
+            return 0
+        return min(inventory.count(item_id) // count for item_id, count in recipe["ingredients"].items())
+
+    def craftable(self, inventory, category=None):
+        """Every recipe the inventory covers, as [(key, times)] sorted by name."""
+        covered = {}
+        for item_id, have in inventory.items():
+            for key, count in self.by_ingredient.get(item_id, ()):
+                if have >= count and (category is None or key[0] == category):
+                    covered[key] = covered.get(key, 0) + 1
+        # A recipe is craftable once every one of its ingredients was counted
+        ready = [key for key, hits in covered.items() if hits == len(self.recipes[key]["ingredients"])]
+        ready.sort(key=lambda key: self.recipes[key]["name"])
+        return [(key, self.times(inventory, key)) for key in ready]
+
+def potion_id_for(sequence_name):
+    # Naming convention in recipes.json: "Clown" -> clown_potion
+    return f"{sequence_name.lower().replace(' ', '_')}_potion"
+
+class PotionIndex:
+    """Maps (pathway, sequence) to the item ids that advance a Beyonder into it.
+
+    Built from the advancement recipes (result_type "advancement" with a
+    target_sequence). A recipe belongs to a pathway through its optional
+    "pathway" field, or else by being named after that pathway's sequence.
+    """
+
+    def __init__(self, pathways, recipes):
+        self.rebuild(pathways, recipes)
+
+    def rebuild(self, pathways, recipes):
+        advancement = {}
+        for entries in recipes.values():
+            for recipe_id, recipe in entries.items():
+                if recipe.get("result_type") == "advancement" and "target_sequence" in recipe:
+                    advancement[recipe_id] = recipe
+
+        potions, missing, claimed = {}, [], set()
+        for pathway_name, pathway in pathways.items():
+            for seq, seq_data in pathway.get("sequences", {}).items():
+                seq = int(seq)
+                if seq >= 9:
+                    continue  # Sequence 9 comes from !choose, not a potion
+                ids = []
+                for recipe_id, recipe in advancement.items():
+                    if recipe["target_sequence"] != seq:
+                        continue
+                    if recipe.get("pathway", pathway_name) != pathway_name:
+                        continue
+                    if "pathway" in recipe or recipe_id == potion_id_for(seq_data["name"]) \
+                            or recipe["name"].lower().startswith(f"{seq_data['name'].lower()} potion"):
+                        ids.append(recipe_id)
+                if ids:
+                    potions[(pathway_name, seq)] = tuple(ids)
+                    claimed.update(ids)
+                else:
+                    missing.append((pathway_name, seq, seq_data["name"]))
+        self.potions = potions
+        self.missing = missing
+        # Advancement recipes no sequence picked up (misnamed or wrong target)
+        self.orphans = sorted(set(advancement) - claimed)
+
+    def get(self, pathway, sequence):
+        return self.potions.get((pathway, int(sequence)), ())
+
+    def report(self):
+        lines = [f"🧪 Advancement potions: {len(self.potions)} sequences mapped, {len(self.missing)} without a recipe."]
+        if self.missing:
+            by_pathway = {}
+            for pathway, seq, name in self.missing:
+                by_pathway.setdefault(pathway, []).append(f"S{seq} {name}")
+            for pathway, seqs in sorted(by_pathway.items()):
+                lines.append(f"   ⚠️ {pathway}: {', '.join(seqs)}")
+        if self.orphans:
+            lines.append(f"   ⚠️ Advancement recipes matching no sequence: {', '.join(self.orphans)}")
+        return "\n".join(lines)
+
+recipe_book = RecipeBook(recipes_db)
+potion_index = PotionIndex(pathways_db, recipes_db)
+
+@on_reload
+def _rebuild_books(changed):
+    if "recipes" in changed:
+        recipe_book.rebuild(recipes_db)
+    if changed & {"recipes", "pathways"}:
+        potion_index.rebuild(pathways_db, recipes_db)
+        print(potion_index.report())
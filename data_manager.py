@@ -1,6 +1,18 @@
+import asyncio
 import json
 import os
-from config import DB_FILE, ITEMS_FILE, EFFECTS_FILE, RECIPES_FILE, PATHWAYS_DIR, COC_STATS, PATHWAY_STATS
+import threading
+import time
+from config import COC_STATS, STORAGE_BACKEND
+from config import SAVE_INTERVAL, SAVE_DIRTY_THRESHOLD, JOURNAL_ENABLED, JOURNAL_MAX_BYTES, PLAYER_CACHE_SIZE
+from config import SHARD_COUNT, WORKER_ID, SYNC_INTERVAL, CHANGE_LOG_RETENTION
+from journal import Journal
+from leaderboard import Leaderboards
+from metrics import metrics, BYTES_BUCKETS
+from migrations import SCHEMA_VERSION, upgrade_record, is_player_id
+from player import Player
+from player_cache import PlayerCache
+from storage import open_store, write_atomic, StaleWrite
 
 def load_json(filename):
     if os.path.exists(filename):
@@ -12,94 +24,334 @@ def load_json(filename):
     return {}
 
 def save_json(filename, data):
-    with open(filename, 'w') as f:
-        json.dump(data, f, indent=4)
-
-def load_pathways():
-    pathways = {}
-    if os.path.exists(PATHWAYS_DIR):
-        for filename in os.listdir(PATHWAYS_DIR):
-            if filename.endswith(".json"):
-                pathway_data = load_json(os.path.join(PATHWAYS_DIR, filename))
-                if "name" in pathway_data:
-                    pathways[pathway_data["name"]] = pathway_data
-    return pathways
+    write_atomic(filename, json.dumps(data, indent=4))
 
 # Global Data Containers
-player_data = load_json(DB_FILE)
-items_db = load_json(ITEMS_FILE)
-effects_db = load_json(EFFECTS_FILE)
-recipes_db = load_json(RECIPES_FILE)
-pathways_db = load_pathways()
+# A sharded worker shares the store with the others (see write_through below);
+# its writes land in the store straight away, so it keeps no journal.
+SHARED = bool(SHARD_COUNT)
+store = open_store(writer=(WORKER_ID or f"worker-{os.getpid()}") if SHARED else None)
+journal = Journal() if JOURNAL_ENABLED and not SHARED else None
+dirty_players = set()
+_save_requested = asyncio.Event()
 
-def get_player(user_id):
+def _load_record(record_id, record):
+    # Records are migrated once as they come out of the store, then saved
+    # back at the next flush; get_player() itself is a plain lookup. Shared
+    # stores only take transactional writes, so there the upgrade is saved
+    # along with the player's next change.
+    if upgrade_record(record_id, record) and not SHARED:
+        dirty_players.add(record_id)
+    return Player.from_dict(record) if is_player_id(record_id) else record
+
+player_data = PlayerCache(store, PLAYER_CACHE_SIZE, dirty_players,
+                          on_overflow=_save_requested.set, on_load=_load_record)
+if PLAYER_CACHE_SIZE and not store.partial_loads:
+    print(f'⚠️ PLAYER_CACHE_SIZE is ignored by the {STORAGE_BACKEND} store, which keeps every player in memory. '
+          f'Set STORAGE_BACKEND=sqlite to cap it.')
+
+# Static content. Filled in at startup by content.load(), from the compiled
+# bundle when it is up to date, and swapped in place by reloads.
+items_db = {}
+effects_db = {}
+recipes_db = {}
+pathways_db = {}
+loot_db = {}
+
+def get_player(user_id, create=True):
     user_id = str(user_id)
-    if user_id not in player_data:
-        player_data[user_id] = {
-            "balance": 120,
-            "pathway": None,
-            "sequence": 9,
-            "acting_name": "Civilian",
-            "level": 1,
-            "xp": 0,
-            "max_xp": 100,
-            "acting_xp": 0,
-            "acting_max_xp": 200,
-            "sanity": 100,
-            "inventory": [],
-            "last_daily": None,
-            "last_work": None,
-            "last_expedition": None,
-            "last_act": None,
-            "acting_mastery": 0,
-            "affiliation": "Neutral",
-            "stats": {s: 1 for s in COC_STATS},
-            "stat_points": 10  # Starting points to assign
-        }
-    
-    player = player_data[user_id]
-    
-    # --- Migrations & Defaults ---
-    if "level" not in player:
-        player["level"] = 1
-    if "xp" not in player:
-        # Migrate old ascension_xp if it exists
-        player["xp"] = player.get("ascension_xp", 0)
-    if "max_xp" not in player:
-        player["max_xp"] = player.get("ascension_max_xp", 100)
-    
-    # Cleanup old keys
-    if "ascension_xp" in player: del player["ascension_xp"]
-    if "ascension_max_xp" in player: del player["ascension_max_xp"]
-
-    if "stats" not in player:
-        player["stats"] = {s: 1 for s in COC_STATS}
-        # Retroactive bonuses for players who already have a pathway
-        pathway = player.get("pathway")
-        if pathway:
-            bonuses = PATHWAY_STATS.get(pathway, {})
-            for stat, bonus in bonuses.items():
-                player["stats"][stat] += bonus
-            
-            # Retroactive points for ascension
-            seq_levels = 9 - player.get("sequence", 9)
-            player["stat_points"] = 10 + (seq_levels // 2)
-    
-    if "stat_points" not in player:
-        player["stat_points"] = 10
-    if "affiliation" not in player:
-        player["affiliation"] = "Neutral"
-    if "inventory" not in player:
-        player["inventory"] = []
+    player = player_data.get(user_id)
+    if player is None:
+        if not create:
+            return None
+        player = player_data[user_id] = Player(
+            balance=120,
+            pathway=None,
+            sequence=9,
+            acting_name="Civilian",
+            level=1,
+            xp=0,
+            max_xp=100,
+            acting_xp=0,
+            acting_max_xp=200,
+            sanity=100,
+            inventory={},
+            last_daily=None,
+            last_work=None,
+            last_expedition=None,
+            last_act=None,
+            acting_mastery=0,
+            affiliation="Neutral",
+            stats={s: 1 for s in COC_STATS},
+            stat_points=10,  # Starting points to assign
+            reminders=[],
+            schema=SCHEMA_VERSION
+        )
     
     return player
 
+def all_players():
+    """Yields (user_id, record) for every player, without pulling them into the cache."""
+    player_data.load()
+    resident = player_data.records
+    if store.partial_loads:
+        for record_id, record in store.load_all().items():
+            if record_id not in resident and is_player_id(record_id):
+                upgrade_record(record_id, record)
+                yield record_id, record
+    for record_id, record in list(resident.items()):
+        if is_player_id(record_id):
+            yield record_id, record
+
+leaderboards = Leaderboards(all_players)
+
+def _new_npc(npc_id):
+    if npc_id == "will_auceptin":
+        return {
+            "name": "Will Auceptin",
+            "bankroll": 0,
+            "wins": 0
+        }
+    return None
+
 def get_npc(npc_id):
     if npc_id not in player_data:
-        if npc_id == "will_auceptin":
-            player_data[npc_id] = {
-                "name": "Will Auceptin",
-                "bankroll": 0,
-                "wins": 0
-            }
+        npc = _new_npc(npc_id)
+        if npc is not None:
+            player_data[npc_id] = npc
     return player_data[npc_id]
+
+async def add_to_npc(npc_id, **amounts):
+    """Adds to an NPC's counters, e.g. add_to_npc("will_auceptin", bankroll=bet, wins=1).
+
+    NPC counters only ever move by increments, which commute, so they're
+    kept out of the commands' transactions: a casino bet only locks its
+    player rather than queueing every bet behind Will's record. Call it once
+    the change it accounts for has committed. Don't take an NPC's record in
+    a transaction either, a rollback would undo increments made meanwhile.
+    """
+    if SHARED:
+        # Added in the store itself, without the stale check; the cached copy
+        # is dropped so the next get_npc() reads the new figures
+        await asyncio.to_thread(store.increment, npc_id, amounts, _new_npc(npc_id))
+        player_data.records.pop(npc_id, None)
+        return
+    npc = get_npc(npc_id)
+    for field, amount in amounts.items():
+        npc[field] = npc.get(field, 0) + amount
+    mark_dirty(npc_id)
+
+# --- Write-behind persistence ---
+# Commands call mark_dirty() instead of rewriting the database themselves.
+# autosave_loop() coalesces those changes and writes them in one go, either
+# every SAVE_INTERVAL seconds or as soon as SAVE_DIRTY_THRESHOLD records changed.
+# Meanwhile each change is appended to the journal, which a flush compacts.
+_flush_lock = asyncio.Lock()
+# Snapshots are numbered so a slow background write can never land on top of
+# a newer one (e.g. the shutdown flush racing a cancelled autosave).
+_write_lock = threading.Lock()
+_generation = journal.last_generation() if journal else 0
+_written_generation = 0
+_in_flight = set()
+
+def mark_dirty(*record_ids):
+    record_ids = [str(record_id) for record_id in record_ids]
+    dirty_players.update(record_ids)
+    for record_id in record_ids:
+        if is_player_id(record_id) and record_id in player_data.records:
+            leaderboards.update(record_id, player_data.records[record_id])
+    if journal:
+        journal.append({record_id: player_data[record_id] for record_id in record_ids if record_id in player_data})
+        if journal.size >= JOURNAL_MAX_BYTES:
+            _save_requested.set()
+    if len(dirty_players) >= SAVE_DIRTY_THRESHOLD:
+        _save_requested.set()
+
+def _serialize():
+    global _generation
+    # A json snapshot is the whole cache: never write one before it's read in
+    player_data.load()
+    _generation += 1
+    if journal:
+        # Everything journaled so far is part of this snapshot
+        journal.rotate(_generation)
+    start = time.perf_counter()
+    payload = store.prepare(player_data.records, dirty_players)
+    if metrics.enabled:
+        metrics.observe("bot_flush_seconds", time.perf_counter() - start, (("phase", "serialize"),))
+        metrics.inc("bot_flush_records_total", amount=len(dirty_players))
+    return payload, _generation
+
+def _write_snapshot(payload, generation):
+    global _written_generation
+    with _write_lock:
+        if generation <= _written_generation:
+            return
+        start = time.perf_counter()
+        store.write(payload)
+        if metrics.enabled:
+            metrics.observe("bot_flush_seconds", time.perf_counter() - start, (("phase", "write"),))
+            metrics.observe("bot_flush_payload_bytes", store.payload_bytes(payload), buckets=BYTES_BUCKETS)
+        _written_generation = generation
+        if journal:
+            journal.discard(generation)
+
+def flush():
+    """Synchronously writes pending changes. Used on shutdown."""
+    # A background write may still be running; include its records so
+    # skipping it in favour of this newer snapshot loses nothing.
+    dirty_players.update(_in_flight)
+    if not dirty_players:
+        return False
+    payload, generation = _serialize()
+    dirty_players.clear()
+    _write_snapshot(payload, generation)
+    player_data.trim()
+    return True
+
+async def flush_async():
+    """Writes pending changes, doing the disk I/O off the event loop."""
+    async with _flush_lock:
+        if not dirty_players:
+            return False
+        # Serialize on the loop so no command can mutate player_data mid-dump,
+        # then hand the finished payload to a worker thread.
+        payload, generation = _serialize()
+        _in_flight.update(dirty_players)
+        dirty_players.clear()
+        try:
+            await asyncio.to_thread(_write_snapshot, payload, generation)
+        except BaseException:
+            dirty_players.update(_in_flight)
+            raise
+        finally:
+            _in_flight.clear()
+        # Records that were only kept around until saved can go now
+        player_data.trim()
+        return True
+
+async def autosave_loop():
+    while True:
+        try:
+            await asyncio.wait_for(_save_requested.wait(), timeout=SAVE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _save_requested.clear()
+        try:
+            await flush_async()
+        except Exception as e:
+            print(f'❌ Autosave failed: {e}')
+
+# --- Sharing the store between workers ---
+# Sharded workers write a transaction's records through as it ends, guarded
+# against anything another worker wrote since the transaction began, instead
+# of leaving them for the autosave. Every write is logged in the store's
+# changes table; sync() reads the log and drops cached records that other
+# workers wrote, so the next get_player() loads their version.
+_sync_seq = store.last_change() if SHARED else 0
+_remote_changes = set()   # for sync_loop's on_change
+
+def sync():
+    """Drops cached records other workers changed.
+
+    Returns the last change seen and the ids of those records, or None in
+    place of the ids if the whole cache had to go.
+    """
+    global _sync_seq
+    if not SHARED:
+        return _sync_seq, set()
+    last, changed = store.changes_since(_sync_seq)
+    _sync_seq = last
+    if changed is None or "*" in changed:
+        # Lost track (or the store was reset): forget everything
+        player_data.clear()
+        leaderboards.clear()
+        dirty_players.clear()
+        return last, None
+    _remote_changes.update(changed)
+    for record_id in changed:
+        player_data.records.pop(record_id, None)
+        dirty_players.discard(record_id)
+        if leaderboards.boards is not None and is_player_id(record_id):
+            record = store.load(record_id)
+            if record is not None:
+                upgrade_record(record_id, record)
+                leaderboards.update(record_id, record)
+    return last, changed
+
+async def write_through(records, since):
+    """Writes {record_id: record} now, unless another worker changed one after change `since`.
+
+    On StaleWrite the records are dropped from the cache before it propagates.
+    """
+    payload = store.prepare(records, list(records))
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(store.write_checked, payload, since)
+    except StaleWrite as e:
+        metrics.inc("bot_stale_writes_total")
+        for record_id in e.record_ids:
+            player_data.records.pop(record_id, None)
+        raise
+    for record_id, record in records.items():
+        # While the write was out, sync() may have let the record go, or a
+        # reader loaded an older copy; the store has the right one either way
+        if player_data.records.get(record_id) is not record:
+            player_data.records.pop(record_id, None)
+        if is_player_id(record_id):
+            leaderboards.update(record_id, record)
+    if metrics.enabled:
+        metrics.observe("bot_flush_seconds", time.perf_counter() - start, (("phase", "write_through"),))
+        metrics.inc("bot_flush_records_total", amount=len(records))
+
+async def sync_loop(on_change=None):
+    """Keeps a sharded worker's cache fresh between transactions.
+
+    `on_change(record_ids)` is called with the records other workers changed.
+    """
+    pruned = time.time()
+    while True:
+        await asyncio.sleep(SYNC_INTERVAL)
+        try:
+            sync()
+            if _remote_changes and on_change:
+                on_change(set(_remote_changes))
+            _remote_changes.clear()
+            if time.time() - pruned > 60:
+                pruned = time.time()
+                await asyncio.to_thread(store.prune_changes, pruned - CHANGE_LOG_RETENTION)
+        except Exception as e:
+            print(f'❌ Sync failed: {e}')
+
+def reset_players():
+    player_data.clear()
+    leaderboards.clear()
+    dirty_players.clear()
+    if journal:
+        journal.reset()
+    store.clear()
+
+async def load_players():
+    """Reads in the player store off the event loop.
+
+    Until it's done the cache loads itself on first use, so calling this is
+    only about doing the reading in the background.
+    """
+    await asyncio.to_thread(player_data.load)
+
+def _recover_from_journal():
+    # Changes logged after the last snapshot, i.e. before a crash
+    recovered = {}
+    journal.replay(recovered)
+    if recovered:
+        print(f'♻️ Recovered {len(recovered)} records from the journal.')
+        # Mark them dirty before they enter the cache so none gets evicted unsaved.
+        # They win over the store when it's read in, and go out with the first
+        # autosave; until then the journal still has them.
+        dirty_players.update(recovered)
+        for record_id, record in recovered.items():
+            player_data[record_id] = _load_record(record_id, record)
+        _save_requested.set()
+
+if journal:
+    _recover_from_journal()
@@ -0,0 +1,33 @@
+# Bot-wide command hooks.
+#
+# discord.py keeps a single before_invoke and a single after_invoke coroutine
+# per bot, so modules that want to see every command (metrics, profiling)
+# register plain functions here and install() wires them all up at once.
+# Before-hooks run in registration order, after-hooks in reverse, so the
+# first one registered wraps all the others.
+
+_before = []
+_after = []
+
+def before_invoke(func):
+    _before.append(func)
+    return func
+
+def after_invoke(func):
+    _after.append(func)
+    return func
+
+def install(bot):
+    if not (_before or _after):
+        return
+
+    @bot.before_invoke
+    async def run_before(ctx):
+        for hook in _before:
+            hook(ctx)
+
+    @bot.after_invoke
+    async def run_after(ctx):
+        # after_invoke runs whether or not the command raised
+        for hook in reversed(_after):
+            hook(ctx)
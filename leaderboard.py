@@ -0,0 +1,253 @@
+from bisect import bisect_left, insort
+
+# Leaderboards.
+#
+# Each board keeps its sort keys in order (SortedKeys), updated whenever
+# mark_dirty() reports a changed player, so a top-N or "my rank" query is a
+# slice or a binary search rather than a sort of every player.
+# Keys sort ascending, best first, and end with the user id so ties are
+# stable. Boards exist globally and, once asked for, per guild.
+
+def _balance(player):
+    return (-player.get("balance", 0),)
+
+def _level(player):
+    return (-player.get("level", 1), -player.get("xp", 0))
+
+def _sequence(player):
+    # A lower sequence is further along; civilians aren't ranked
+    if not player.get("pathway"):
+        return None
+    return (player.get("sequence", 9), -player.get("acting_xp", 0))
+
+def _mastery(player):
+    return (-player.get("acting_mastery", 0),)
+
+BOARDS = {
+    "balance": _balance,
+    "level": _level,
+    "sequence": _sequence,
+    "mastery": _mastery,
+}
+
+
+class SortedKeys:
+    """A sorted list split into buckets of about LOAD keys.
+
+    The layout of sortedcontainers' SortedList. An insert or delete bisects
+    the bucket maxima, then shifts at most 2 * LOAD keys inside one bucket
+    instead of up to every key of a flat list. Positions come from a Fenwick
+    tree over the bucket lengths, so a rank is two bisects and log(n / LOAD)
+    additions. Keys moving inside a bucket adjust the tree in place; the
+    occasional split or merge of buckets drops it, and the next index()
+    rebuilds it in one pass. See benchmarks/rank_index.py.
+    """
+
+    LOAD = 512
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self.buckets = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self.maxes = [bucket[-1] for bucket in self.buckets]
+        self.size = len(keys)
+        self._tree = None   # Fenwick tree over len(bucket), 1-based
+
+    def add(self, key):
+        if not self.buckets:
+            self.buckets.append([key])
+            self.maxes.append(key)
+            self._tree = None
+        else:
+            i = min(bisect_left(self.maxes, key), len(self.maxes) - 1)
+            insort(self.buckets[i], key)
+            self._adjust(i, 1)
+            self._rebalance(i)
+        self.size += 1
+
+    def remove(self, key):
+        i = bisect_left(self.maxes, key)
+        bucket = self.buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        self.size -= 1
+        self._adjust(i, -1)
+        self._rebalance(i)
+
+    def _rebalance(self, i):
+        bucket = self.buckets[i]
+        if len(bucket) > 2 * self.LOAD:
+            self.buckets[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self.maxes[i:i + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+            self._tree = None
+        elif len(bucket) < self.LOAD // 2 and len(self.buckets) > 1:
+            # Fold a small bucket into a neighbour, splitting again if that overflows
+            i = min(i, len(self.buckets) - 2)
+            self.buckets[i:i + 2] = [self.buckets[i] + self.buckets[i + 1]]
+            self.maxes[i:i + 2] = [self.buckets[i][-1]]
+            self._tree = None
+            self._rebalance(i)
+        elif bucket:
+            self.maxes[i] = bucket[-1]
+        else:
+            del self.buckets[i], self.maxes[i]
+            self._tree = None
+
+    def _adjust(self, i, delta):
+        tree = self._tree
+        if tree is None:
+            return
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _build_tree(self):
+        tree = [0] + [len(bucket) for bucket in self.buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+        return tree
+
+    def index(self, key):
+        """Position of a key that is in the list."""
+        i = bisect_left(self.maxes, key)
+        tree = self._tree or self._build_tree()
+        # Keys in buckets[:i]
+        position, j = 0, i
+        while j:
+            position += tree[j]
+            j -= j & -j
+        return position + bisect_left(self.buckets[i], key)
+
+    def first(self, n):
+        keys = []
+        for bucket in self.buckets:
+            if len(keys) >= n:
+                break
+            keys.extend(bucket[:n - len(keys)])
+        return keys
+
+    def __len__(self):
+        return self.size
+
+
+class RankIndex:
+    """User ids ordered by sort key."""
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})   # user_id: key
+        self.keys = SortedKeys(key + (user_id,) for user_id, key in self.entries.items())
+
+    def update(self, user_id, key):
+        old = self.entries.get(user_id)
+        if old == key:
+            return
+        if old is not None:
+            self.keys.remove(old + (user_id,))
+        if key is None:
+            self.entries.pop(user_id, None)
+        else:
+            self.entries[user_id] = key
+            self.keys.add(key + (user_id,))
+
+    def remove(self, user_id):
+        self.update(user_id, None)
+
+    def rank(self, user_id):
+        """1-based position, or None if the user isn't on this board."""
+        key = self.entries.get(user_id)
+        if key is None:
+            return None
+        return self.keys.index(key + (user_id,)) + 1
+
+    def top(self, n):
+        return [key[-1] for key in self.keys.first(n)]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class Leaderboards:
+    """Global and per-guild RankIndexes for every board in BOARDS.
+
+    `source()` yields (user_id, player) for every player; it is only walked
+    the first time a board is needed, after which update() keeps things current.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.boards = None          # global: {board: RankIndex}
+        self.guilds = {}            # guild_id: {board: RankIndex}
+        self.user_guilds = {}       # user_id: {guild_id, ...} with a built scope
+
+    def _build(self):
+        entries = {name: {} for name in BOARDS}
+        for user_id, player in self.source():
+            for name, score in BOARDS.items():
+                key = score(player)
+                if key is not None:
+                    entries[name][user_id] = key
+        self.boards = {name: RankIndex(board) for name, board in entries.items()}
+
+    def update(self, user_id, player):
+        if self.boards is None:
+            return
+        for name, score in BOARDS.items():
+            key = score(player)
+            self.boards[name].update(user_id, key)
+            for guild_id in self.user_guilds.get(user_id, ()):
+                self.guilds[guild_id][name].update(user_id, key)
+
+    def board(self, name, guild_id=None, member_ids=None):
+        """The RankIndex for a board, globally or for one guild.
+
+        A guild's boards are built the first time they're asked for, from
+        `member_ids` and the keys already in the global boards. They're kept
+        current from then on, so `member_ids` must be the guild's complete
+        member list.
+        """
+        if self.boards is None:
+            self._build()
+        if guild_id is None:
+            return self.boards[name]
+        if guild_id not in self.guilds:
+            if member_ids is None:
+                raise ValueError(f"Guild {guild_id}'s boards aren't built; pass its member ids")
+            members = [str(m) for m in member_ids]
+            self.guilds[guild_id] = {
+                board: RankIndex({m: index.entries[m] for m in members if m in index.entries})
+                for board, index in self.boards.items()
+            }
+            for m in members:
+                self.user_guilds.setdefault(m, set()).add(guild_id)
+        return self.guilds[guild_id][name]
+
+    def has_guild(self, guild_id):
+        return guild_id in self.guilds
+
+    def join(self, guild_id, user_id):
+        """Puts a user on a guild's boards, if that guild's boards are built."""
+        user_id = str(user_id)
+        scope = self.guilds.get(guild_id)
+        if scope is None or guild_id in self.user_guilds.get(user_id, ()):
+            return
+        self.user_guilds.setdefault(user_id, set()).add(guild_id)
+        for name, index in scope.items():
+            key = self.boards[name].entries.get(user_id)
+            if key is not None:
+                index.update(user_id, key)
+
+    def leave(self, guild_id, user_id):
+        user_id = str(user_id)
+        guilds = self.user_guilds.get(user_id)
+        if not guilds or guild_id not in guilds:
+            return
+        guilds.discard(guild_id)
+        for index in self.guilds[guild_id].values():
+            index.remove(user_id)
+
+    def clear(self):
+        self.boards = None
+        self.guilds.clear()
+        self.user_guilds.clear()
@@ -0,0 +1,47 @@
+from bisect import bisect_right
+
+# Player level curve.
+#
+# Level 1 needs 100 XP and each level after that needs 20% more than the one
+# before (rounded down). Instead of stepping through that one level at a
+# time, the per-level costs and their running totals are kept in a table, so
+# any XP amount maps to a level with a binary search. The table grows on
+# demand as players reach new levels.
+
+BASE_XP = 100
+GROWTH = 1.2
+STAT_POINT_EVERY = 5    # levels
+STAT_POINTS_AWARDED = 2
+
+class XPCurve:
+    def __init__(self, base=BASE_XP, growth=GROWTH):
+        self.growth = growth
+        # Indexed by level; slot 0 is unused
+        self.costs = [0, base]    # XP to go from level L to L + 1
+        self.totals = [0, 0]      # XP needed from level 1 to reach level L
+
+    def _extend(self, level=None, total=None):
+        while (level is not None and len(self.costs) <= level) or (total is not None and self.totals[-1] <= total):
+            self.totals.append(self.totals[-1] + self.costs[-1])
+            self.costs.append(int(self.costs[-1] * self.growth))
+
+    def cost(self, level):
+        """XP needed to go from `level` to the next one."""
+        self._extend(level=level)
+        return self.costs[level]
+
+    def total(self, level):
+        """Cumulative XP needed to reach `level` from level 1."""
+        self._extend(level=level)
+        return self.totals[level]
+
+    def level_for(self, total):
+        """The level reached with `total` cumulative XP."""
+        self._extend(total=total)
+        return bisect_right(self.totals, total, lo=1) - 1
+
+xp_curve = XPCurve()
+
+def stat_points_between(old_level, new_level):
+    """Stat points earned for every multiple of STAT_POINT_EVERY crossed going up from old_level."""
+    return (new_level // STAT_POINT_EVERY - old_level // STAT_POINT_EVERY) * STAT_POINTS_AWARDED
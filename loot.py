@@ -0,0 +1,234 @@
+import argparse
+import math
+import random
+import sys
+from collections import Counter
+from content import on_reload
+from data_manager import loot_db, items_db, recipes_db
+
+# Weighted loot for !expedition and !daily.
+#
+# loot_tables.json puts items into rarity tiers (anything it doesn't list is
+# in the default tier) and gives each activity a table of tier weights. A
+# drop lands on a tier with the table's odds, then on one of that tier's
+# items, all equally likely except that items tied to the player's pathway
+# weigh `pathway_bonus` times as much. Tables with by_sequence multiply each
+# tier by its `sequence_bonus` once for every sequence the player is above 9.
+# A player carrying an insight artifact (a crafted item whose recipe has the
+# "insight" effect) gets `insight_bonus` more odds on the rare tiers in total,
+# taken from the other tiers in proportion.
+#
+# Each (activity, pathway, sequence, insight) combination is flattened into
+# one alias table over the items the first time it is needed, so a drop
+# costs one random number and two list lookups however many items there are.
+# Compiled tables are dropped whenever loot, items or recipes reload.
+#
+#   python loot.py [expedition daily] [--pathway Sun] [--sequence 7] [--insight] [--draws 100000]
+#
+# prints the effective drop rates of the tables, checked against a sample.
+
+INSIGHT = "insight"
+
+class AliasTable:
+    """Vose's alias method: O(n) to build from {outcome: weight}, O(1) per draw."""
+
+    def __init__(self, weights):
+        outcomes = [outcome for outcome, weight in weights.items() if weight > 0]
+        if not outcomes:
+            raise ValueError("An alias table needs at least one positive weight")
+        n = len(outcomes)
+        total = sum(weights[outcome] for outcome in outcomes)
+        scaled = [weights[outcome] * n / total for outcome in outcomes]
+        prob, alias = [1.0] * n, list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less], alias[less] = scaled[less], more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # Whatever is left over is a full column, up to rounding
+        self.outcomes, self.prob, self.alias = outcomes, prob, alias
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def draw(self, rng=random):
+        # The integer part picks the column, the fraction decides between it and its alias
+        u = rng.random() * len(self.outcomes)
+        i = int(u)
+        return self.outcomes[i] if u - i < self.prob[i] else self.outcomes[self.alias[i]]
+
+    def sample(self, n, rng=random):
+        return [self.draw(rng) for _ in range(n)]
+
+    def probabilities(self):
+        """The odds the table actually encodes, {outcome: p}."""
+        n = len(self.outcomes)
+        odds = [p / n for p in self.prob]
+        for p, other in zip(self.prob, self.alias):
+            odds[other] += (1 - p) / n
+        return dict(zip(self.outcomes, odds))
+
+class LootTables:
+    def __init__(self, loot, items, recipes):
+        self.loot, self.items, self.recipes = loot, items, recipes
+        self.reset()
+
+    def reset(self):
+        self._compiled = {}
+        self._members = self._tiers = None
+        self._insight_items = None
+
+    def members(self):
+        """{tier: [item_id]}, every item in exactly one tier."""
+        if self._members is None:
+            default = self.loot.get("default_tier", "common")
+            listed = {item_id: tier_name for tier_name, tier in self.loot["tiers"].items()
+                      for item_id in tier.get("items", ())}
+            members = {tier_name: [] for tier_name in self.loot["tiers"]}
+            for item_id in self.items:
+                members[listed.get(item_id, default)].append(item_id)
+            self._members, self._tiers = members, listed
+        return self._members
+
+    def tier_of(self, item_id):
+        self.members()
+        return self._tiers.get(item_id, self.loot.get("default_tier", "common"))
+
+    def insight_items(self):
+        if self._insight_items is None:
+            # A crafted recipe lands in the inventory under its own id
+            self._insight_items = tuple(recipe_id for entries in self.recipes.values()
+                                        for recipe_id, recipe in entries.items() if recipe.get("effect") == INSIGHT)
+        return self._insight_items
+
+    def has_insight(self, player):
+        return any(player["inventory"].has(item_id) for item_id in self.insight_items())
+
+    def options(self, activity, pathway=None, sequence=9, insight=False):
+        """The compiled table key, with whatever the activity ignores left out."""
+        table = self.loot["tables"][activity]
+        return (activity, pathway if table.get("by_pathway") else None,
+                int(sequence) if table.get("by_sequence") else 9, bool(insight))
+
+    def tier_odds(self, activity, pathway=None, sequence=9, insight=False):
+        """{tier: probability} of a single drop."""
+        members = self.members()
+        weights = {tier_name: weight for tier_name, weight in self.loot["tables"][activity]["weights"].items()
+                   if weight > 0 and members.get(tier_name)}
+        if not weights:
+            raise ValueError(f"Loot table {activity} has no items to drop")
+        if self.loot["tables"][activity].get("by_sequence"):
+            for tier_name, bonus in self.loot.get("sequence_bonus", {}).items():
+                if tier_name in weights:
+                    weights[tier_name] *= bonus ** (9 - int(sequence))
+        total = sum(weights.values())
+        odds = {tier_name: weight / total for tier_name, weight in weights.items()}
+        if insight:
+            rare = {tier_name for tier_name in odds if self.loot["tiers"][tier_name].get("rare")}
+            p_rare = sum(odds[tier_name] for tier_name in rare)
+            boost = min(self.loot.get("insight_bonus", 0), 1 - p_rare)
+            if p_rare and boost > 0:
+                for tier_name in odds:
+                    odds[tier_name] *= ((p_rare + boost) / p_rare if tier_name in rare
+                                        else (1 - p_rare - boost) / (1 - p_rare))
+        return odds
+
+    def compile(self, activity, pathway=None, sequence=9, insight=False):
+        """The AliasTable over items for one combination, built once and cached."""
+        key = self.options(activity, pathway, sequence, insight)
+        table = self._compiled.get(key)
+        if table is None:
+            members = self.members()
+            favoured = set(self.loot.get("pathways", {}).get(key[1], ()))
+            bonus = self.loot.get("pathway_bonus", 1)
+            weights = {}
+            for tier_name, p in self.tier_odds(*key).items():
+                item_weights = {item_id: bonus if item_id in favoured else 1 for item_id in members[tier_name]}
+                total = sum(item_weights.values())
+                for item_id, weight in item_weights.items():
+                    weights[item_id] = p * weight / total
+            table = self._compiled[key] = AliasTable(weights)
+        return table
+
+    def roll(self, activity, player, rolls=None, rng=random):
+        """The item ids a player finds on one activity (the table's number of rolls by default)."""
+        table = self.compile(activity, player["pathway"], player["sequence"], self.has_insight(player))
+        return table.sample(rolls or self.loot["tables"][activity].get("rolls", 1), rng)
+
+    def describe(self, item_ids):
+        """"**Name**, **Name** *(rare)*..." for a reply, marking anything above the default tier."""
+        default = self.loot.get("default_tier", "common")
+        parts = []
+        for item_id, count in Counter(item_ids).items():
+            text = f"**{self.items[item_id]['name']}**" + (f" x{count}" if count > 1 else "")
+            tier_name = self.tier_of(item_id)
+            parts.append(text if tier_name == default else f"{text} *({tier_name})*")
+        return ", ".join(parts)
+
+    def report(self, activity, pathway=None, sequence=9, insight=False, draws=0, rng=random, top=5):
+        """The effective drop rates of one table, per tier and for the likeliest items.
+
+        With `draws`, also samples the table that many times and compares the
+        observed rates with the expected ones.
+        """
+        key = self.options(activity, pathway, sequence, insight)
+        table = self.compile(*key)
+        odds = table.probabilities()
+        intended = self.tier_odds(*key)
+        members = self.members()
+        _, pathway, sequence, insight = key
+        lines = [f"🎲 {activity}: {pathway or 'any pathway'}, sequence {sequence}"
+                 + (", insight" if insight else "") + f" ({len(table)} items)"]
+        observed = Counter(table.sample(draws, rng)) if draws else None
+        for tier_name, p_tier in intended.items():
+            effective = sum(odds.get(item_id, 0) for item_id in members[tier_name])
+            line = f"   {tier_name:<10}{effective:>8.3%}"
+            if abs(effective - p_tier) > 1e-9:
+                line += f"   ⚠️ configured {p_tier:.3%}"
+            if observed is not None:
+                seen = sum(observed[item_id] for item_id in members[tier_name]) / draws
+                line += f"   observed {seen:.3%}"
+            lines.append(line)
+        likeliest = sorted(odds.items(), key=lambda kv: -kv[1])[:top]
+        lines.append("   likeliest: " + ", ".join(f"{self.items[item_id]['name']} {p:.2%}" for item_id, p in likeliest))
+        if observed is not None and len(odds) > 1:
+            # Pearson's chi-squared over the items; far outside ±4 means the sampler is off
+            chi2 = sum((observed[item_id] - draws * p) ** 2 / (draws * p) for item_id, p in odds.items())
+            df = len(odds) - 1
+            z = (chi2 - df) / math.sqrt(2 * df)
+            lines.append(f"   χ² = {chi2:.0f} on {df} df (z = {z:+.1f}) over {draws} draws"
+                         + ("" if abs(z) < 4 else "   ⚠️ the sample doesn't match the table"))
+        return "\n".join(lines)
+
+loot_tables = LootTables(loot_db, items_db, recipes_db)
+
+@on_reload
+def _reset_tables(changed):
+    if changed & {"loot", "items", "recipes"}:
+        loot_tables.reset()
+
+if __name__ == "__main__":
+    from catalog import ContentError, read_checked
+    parser = argparse.ArgumentParser(description="Print the effective drop rates of the loot tables.")
+    parser.add_argument("activities", nargs="*", help="tables to report (default: all)")
+    parser.add_argument("--pathway")
+    parser.add_argument("--sequence", type=int, default=9)
+    parser.add_argument("--insight", action="store_true", help="as a player carrying an insight artifact")
+    parser.add_argument("--draws", type=int, default=0, help="sample each table this many times")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        catalogs = read_checked()
+    except ContentError as e:
+        sys.exit(f"❌ Content is invalid:\n{e}")
+    if args.pathway and args.pathway not in catalogs["pathways"]:
+        sys.exit(f"❓ Unknown pathway {args.pathway}.")
+    tables = LootTables(catalogs["loot"], catalogs["items"], catalogs["recipes"])
+    unknown = [activity for activity in args.activities if activity not in catalogs["loot"]["tables"]]
+    if unknown:
+        sys.exit(f"❓ Unknown loot tables: {', '.join(unknown)}. Choose from {', '.join(catalogs['loot']['tables'])}.")
+    rng = random.Random(args.seed)
+    for activity in args.activities or catalogs["loot"]["tables"]:
+        print(tables.report(activity, args.pathway, args.sequence, args.insight, args.draws, rng))
@@ -0,0 +1,175 @@
+import asyncio
+import functools
+import time
+from bisect import bisect_left
+import hooks
+from config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT
+
+# Runtime metrics.
+#
+# Counters and fixed-bucket histograms, kept in plain dicts keyed by metric
+# name and label values, readable through the admin !metrics command and,
+# when METRICS_PORT is set, scrapeable in the Prometheus text format from a
+# small local HTTP endpoint. With METRICS_ENABLED off no hook is installed
+# and the few direct calls return straight away.
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))  # 1 KiB .. 256 MiB
+
+HELP = {
+    "bot_command_seconds": ("histogram", "Command run time, from before_invoke to after_invoke."),
+    "bot_commands_total": ("counter", "Commands invoked."),
+    "bot_command_errors_total": ("counter", "Commands that raised."),
+    "bot_cooldown_rejections_total": ("counter", "Commands refused because a cooldown was running."),
+    "bot_view_seconds": ("histogram", "Button and other view callback run time."),
+    "bot_flush_seconds": ("histogram", "Persistence flush time, by phase."),
+    "bot_flush_payload_bytes": ("histogram", "Size of each snapshot written."),
+    "bot_flush_records_total": ("counter", "Player records written by flushes."),
+    "bot_startup_seconds": ("histogram", "Time spent in each phase of the last cold start."),
+    "bot_stale_writes_total": ("counter", "Transactions refused because another worker changed their records first."),
+}
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (inf past the last bucket)."""
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.counters = {}    # (name, labels): value
+        self.histograms = {}  # (name, labels): Histogram
+        self.server = None
+
+    def inc(self, name, labels=(), amount=1):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=(), buckets=SECONDS_BUCKETS):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get((name, labels))
+        if histogram is None:
+            histogram = self.histograms[(name, labels)] = Histogram(buckets)
+        histogram.observe(value)
+
+    def counter(self, name, labels=()):
+        return self.counters.get((name, labels), 0)
+
+    def histogram(self, name, labels=()):
+        return self.histograms.get((name, labels))
+
+    def by_label(self, name):
+        """{label value: Histogram} for a histogram with a single label."""
+        return {labels[0][1]: h for (n, labels), h in self.histograms.items() if n == name}
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    # --- Hooks ---
+    def install(self):
+        """Times every command through the bot-wide hooks. Does nothing when metrics are off."""
+        if not self.enabled:
+            return
+
+        @hooks.before_invoke
+        def start_timer(ctx):
+            ctx.metrics_start = time.perf_counter()
+
+        @hooks.after_invoke
+        def stop_timer(ctx):
+            labels = (("command", ctx.command.qualified_name),)
+            self.observe("bot_command_seconds", time.perf_counter() - ctx.metrics_start, labels)
+            self.inc("bot_commands_total", labels)
+            if ctx.command_failed:
+                self.inc("bot_command_errors_total", labels)
+
+    def timed_view(self, name):
+        """Decorator timing a view callback as bot_view_seconds{view=name}."""
+        def decorate(callback):
+            if not self.enabled:
+                return callback
+            labels = (("view", name),)
+            @functools.wraps(callback)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await callback(*args, **kwargs)
+                finally:
+                    self.observe("bot_view_seconds", time.perf_counter() - start, labels)
+            return wrapper
+        return decorate
+
+    # --- Exposition ---
+    def render(self):
+        """Everything in the Prometheus text exposition format."""
+        series = {}
+        for (name, labels), value in self.counters.items():
+            series.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), h in self.histograms.items():
+            lines = series.setdefault(name, [])
+            cumulative = 0
+            for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {h.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        out = []
+        for name in sorted(series):
+            kind, description = HELP.get(name, ("untyped", ""))
+            out.append(f"# HELP {name} {description}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(series[name])
+        return "\n".join(out) + "\n"
+
+    async def serve(self, host=METRICS_HOST, port=METRICS_PORT):
+        """Serves render() over HTTP on every path. Returns None if there's nothing to serve."""
+        if not (self.enabled and port):
+            return None
+        self.server = await asyncio.start_server(self._handle, host, port)
+        print(f'📊 Metrics on http://{host}:{port}/metrics')
+        return self.server
+
+    async def _handle(self, reader, writer):
+        try:
+            # Read the request line and headers; the path doesn't matter
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            body = self.render().encode()
+            writer.write(b"HTTP/1.0 200 OK\r\n"
+                         b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+metrics = Metrics()
@@ -0,0 +1,128 @@
+import copy
+import sys
+from config import COC_STATS, PATHWAY_STATS
+from player import COOLDOWN_FIELDS, to_epoch
+
+# Player record migrations.
+#
+# Every player record carries a "schema" number. Records are upgraded once,
+# when they are read from the store, by running each registered migration
+# newer than their schema in order; get_player() never has to check for
+# missing fields again. To change the record layout, add a function below
+# with the next version number.
+
+MIGRATIONS = []
+
+def migration(version, description):
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+def is_player_id(record_id):
+    # Players are keyed by Discord id, NPCs (e.g. "will_auceptin") by name
+    return record_id.isdigit()
+
+@migration(1, "Level and XP fields (replaces ascension_xp)")
+def _level_fields(player):
+    if "level" not in player:
+        player["level"] = 1
+    if "xp" not in player:
+        # Migrate old ascension_xp if it exists
+        player["xp"] = player.get("ascension_xp", 0)
+    if "max_xp" not in player:
+        player["max_xp"] = player.get("ascension_max_xp", 100)
+
+    # Cleanup old keys
+    if "ascension_xp" in player: del player["ascension_xp"]
+    if "ascension_max_xp" in player: del player["ascension_max_xp"]
+
+@migration(2, "Characteristics with retroactive pathway bonuses")
+def _stats(player):
+    if "stats" not in player:
+        player["stats"] = {s: 1 for s in COC_STATS}
+        # Retroactive bonuses for players who already have a pathway
+        pathway = player.get("pathway")
+        if pathway:
+            bonuses = PATHWAY_STATS.get(pathway, {})
+            for stat, bonus in bonuses.items():
+                player["stats"][stat] += bonus
+
+            # Retroactive points for ascension
+            seq_levels = 9 - player.get("sequence", 9)
+            player["stat_points"] = 10 + (seq_levels // 2)
+
+@migration(3, "Stat points, affiliation and inventory defaults")
+def _defaults(player):
+    if "stat_points" not in player:
+        player["stat_points"] = 10
+    if "affiliation" not in player:
+        player["affiliation"] = "Neutral"
+    if "inventory" not in player:
+        player["inventory"] = []
+
+@migration(4, "Inventory as item counts instead of one entry per unit")
+def _inventory_counts(player):
+    inventory = player.get("inventory")
+    if isinstance(inventory, list):
+        counts = {}
+        for item_id in inventory:
+            counts[item_id] = counts.get(item_id, 0) + 1
+        player["inventory"] = counts
+
+@migration(5, "Cooldown stamps as UTC epoch seconds; ready reminders opt-in list")
+def _epoch_cooldowns(player):
+    for field in COOLDOWN_FIELDS:
+        player[field] = to_epoch(player.get(field))
+    player.setdefault("reminders", [])
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def upgrade_record(record_id, record, touched=None):
+    """Brings a stored record up to SCHEMA_VERSION in place.
+
+    Returns True if the record changed. `touched`, if given, counts how many
+    records each migration actually modified.
+    """
+    if not is_player_id(record_id):
+        return False
+    version = record.get("schema", 0)
+    if version >= SCHEMA_VERSION:
+        return False
+    for number, _, func in MIGRATIONS:
+        if number <= version:
+            continue
+        before = copy.deepcopy(record) if touched is not None else None
+        func(record)
+        if touched is not None and record != before:
+            touched[number] = touched.get(number, 0) + 1
+    record["schema"] = SCHEMA_VERSION
+    return True
+
+def upgrade_all(records, touched=None):
+    """Upgrades every record of a {record_id: record} mapping. Returns the changed ids."""
+    return [record_id for record_id, record in records.items() if upgrade_record(record_id, record, touched)]
+
+if __name__ == "__main__":
+    # python migrations.py [--dry-run]
+    from storage import open_store
+    dry_run = "--dry-run" in sys.argv[1:]
+    store = open_store()
+    records = store.load_all()
+    if dry_run:
+        records = copy.deepcopy(records)
+    touched = {}
+    changed = upgrade_all(records, touched)
+
+    print(f"Schema version {SCHEMA_VERSION}, {len(records)} records in the {store.name} store")
+    for number, description, _ in MIGRATIONS:
+        print(f"  v{number} {description}: {touched.get(number, 0)} records")
+    print(f"{len(changed)} records needed upgrading")
+
+    if dry_run:
+        print("Dry run, nothing written.")
+    elif changed:
+        store.write(store.prepare(records, changed))
+        print(f"✅ Wrote {len(changed)} upgraded records.")
+    store.close()
@@ -0,0 +1,226 @@
+import sys
+from array import array
+from datetime import datetime
+from config import COC_STATS
+
+# Compact in-memory player record.
+#
+# Stored players are plain JSON objects; in memory each one is a Player with
+# __slots__ instead of a 20-key dict. Characteristics are packed into a small
+# int array in COC_STATS order, cooldown stamps are epoch seconds and strings
+# that repeat across players (item ids, pathway and sequence names) are
+# interned, and the inventory is a count per item id. Player still answers player["balance"], player.get(...) and
+# player["stats"]["STR"] += 1 like the dict it replaces, and to_dict()
+# produces exactly the stored JSON shape.
+
+STAT_INDEX = {stat: i for i, stat in enumerate(COC_STATS)}
+COOLDOWN_FIELDS = ("last_daily", "last_work", "last_expedition", "last_act")
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def to_epoch(value):
+    """Converts a cooldown stamp (epoch, or a pre-v5 ISO string) to epoch seconds."""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    try: return int(datetime.fromisoformat(value).timestamp())
+    except ValueError: return None
+
+
+class Stats:
+    """The eight characteristics as one packed array, indexed by stat name."""
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = values
+
+    @classmethod
+    def from_dict(cls, stats):
+        return cls(array('h', (stats.get(s, 1) for s in COC_STATS)))
+
+    def __getitem__(self, stat):
+        return self.values[STAT_INDEX[stat]]
+
+    def __setitem__(self, stat, value):
+        self.values[STAT_INDEX[stat]] = value
+
+    def __contains__(self, stat):
+        return stat in STAT_INDEX
+
+    def get(self, stat, default=None):
+        return self.values[STAT_INDEX[stat]] if stat in STAT_INDEX else default
+
+    def items(self):
+        return zip(COC_STATS, self.values)
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+class Inventory:
+    """A player's items as {item_id: count}, with a running total.
+
+    Every operation is O(1) per distinct item id, whatever the hoard size.
+    """
+    __slots__ = ("counts", "total")
+
+    def __init__(self, counts=None):
+        self.counts = {}
+        self.total = 0
+        if counts:
+            self.add_many(counts)
+
+    @classmethod
+    def from_list(cls, item_ids):
+        # The pre-count form: one list entry per unit
+        inventory = cls()
+        for item_id in item_ids:
+            inventory.add(item_id)
+        return inventory
+
+    def add(self, item_id, count=1):
+        item_id = sys.intern(item_id)
+        self.counts[item_id] = self.counts.get(item_id, 0) + count
+        self.total += count
+
+    def remove(self, item_id, count=1):
+        """Takes `count` units of an item. Returns False (and takes nothing) if there aren't enough."""
+        have = self.counts.get(item_id, 0)
+        if have < count:
+            return False
+        if have == count:
+            del self.counts[item_id]
+        else:
+            self.counts[item_id] = have - count
+        self.total -= count
+        return True
+
+    def count(self, item_id):
+        return self.counts.get(item_id, 0)
+
+    def has(self, item_id, count=1):
+        return self.counts.get(item_id, 0) >= count
+
+    def missing(self, wanted):
+        """First (item_id, count) of a {item_id: count} request that can't be covered, or None."""
+        for item_id, count in wanted.items():
+            if self.counts.get(item_id, 0) < count:
+                return item_id, count
+        return None
+
+    def has_all(self, wanted):
+        return self.missing(wanted) is None
+
+    def add_many(self, items):
+        for item_id, count in items.items():
+            self.add(item_id, count)
+
+    def remove_many(self, wanted):
+        """Takes every {item_id: count} at once, or nothing if any is short."""
+        if not self.has_all(wanted):
+            return False
+        for item_id, count in wanted.items():
+            self.remove(item_id, count)
+        return True
+
+    def items(self):
+        return self.counts.items()
+
+    def __contains__(self, item_id):
+        return item_id in self.counts
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def __len__(self):
+        return self.total
+
+    def to_dict(self):
+        return dict(self.counts)
+
+
+class Player:
+    FIELDS = (
+        "balance", "pathway", "sequence", "acting_name", "level", "xp", "max_xp",
+        "acting_xp", "acting_max_xp", "sanity", "inventory", "last_daily", "last_work",
+        "last_expedition", "last_act", "acting_mastery", "affiliation", "stats",
+        "stat_points", "reminders", "schema",
+    )
+    # `extra` keeps any stored key this class doesn't know about, so a record
+    # written by a newer version survives a round trip.
+    __slots__ = FIELDS + ("extra",)
+    _FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, **fields):
+        self.restore(fields)
+
+    def restore(self, data):
+        """Sets every field from a to_dict()-shaped mapping, e.g. to roll back a change."""
+        fields = dict(data)
+        self.extra = None
+        for name in self.FIELDS:
+            self[name] = fields.pop(name, None)
+        if fields:
+            self.extra = fields
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        data = {}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            if name in ("stats", "inventory"):
+                value = value.to_dict() if value is not None else None
+            data[name] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    # --- dict-style access, so cogs can keep writing player["xp"] ---
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            if key in COOLDOWN_FIELDS:
+                value = to_epoch(value)
+            elif key == "stats" and isinstance(value, dict):
+                value = Stats.from_dict(value)
+            elif key == "inventory" and isinstance(value, list):
+                value = Inventory.from_list(value)
+            elif key == "inventory" and isinstance(value, dict):
+                value = Inventory(value)
+            else:
+                value = _intern(value)
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET:
+            setattr(self, key, None)
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    # A field left unset (None) counts as missing, like an absent dict key
+    def __contains__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key) is not None
+        return bool(self.extra and key in self.extra)
+
+    def get(self, key, default=None):
+        try: value = self[key]
+        except KeyError: return default
+        return default if value is None else value
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+class PlayerCache(MutableMapping):
+    """Keeps recently used player records in memory, in LRU order.
+
+    Records missing from memory are loaded from the store on access. Once more
+    than `maxsize` records are resident the least recently used clean ones are
+    dropped; dirty ones stay until the write-behind flush has saved them, at
+    which point trim() lets them go. maxsize=0 means no limit.
+
+    Stores that can't load a single record (JsonStore) are read entirely,
+    by load() or else on first access, and never evicted from. Every record
+    read from the store goes through `on_load(record_id, record)`, whose
+    return value is what gets cached.
+    """
+
+    def __init__(self, store, maxsize, dirty, on_overflow=None, on_load=None):
+        self.store = store
+        self.dirty = dirty
+        self.on_overflow = on_overflow
+        self.on_load = on_load
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.records = OrderedDict()
+        self.maxsize = maxsize if store.partial_loads else 0
+        self.loaded = store.partial_loads
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """Reads in a store that only loads whole. Safe to call from a worker thread, and more than once."""
+        with self._load_lock:
+            if self.loaded:
+                return
+            records = OrderedDict(self.store.load_all())
+            if self.on_load:
+                for record_id, record in records.items():
+                    records[record_id] = self.on_load(record_id, record)
+            # Anything set while loading (nothing should be) wins over the store
+            records.update(self.records)
+            self.records = records
+            self.loaded = True
+
+    def __getitem__(self, record_id):
+        if not self.loaded:
+            self.load()
+        record = self.records.get(record_id)
+        if record is not None:
+            self.hits += 1
+            self.records.move_to_end(record_id)
+            return record
+        self.misses += 1
+        record = self.store.load(record_id) if self.maxsize else None
+        if record is None:
+            raise KeyError(record_id)
+        if self.on_load:
+            record = self.on_load(record_id, record)
+        self.records[record_id] = record
+        self.trim()
+        return record
+
+    def __setitem__(self, record_id, record):
+        self.records[record_id] = record
+        self.records.move_to_end(record_id)
+        self.trim()
+
+    def __delitem__(self, record_id):
+        del self.records[record_id]
+
+    # Iteration and len() only cover resident records; use store.load_all()
+    # to walk everyone.
+    def __iter__(self):
+        if not self.loaded:
+            self.load()
+        return iter(self.records)
+
+    def __len__(self):
+        if not self.loaded:
+            self.load()
+        return len(self.records)
+
+    def clear(self):
+        self.records.clear()
+
+    def trim(self):
+        excess = len(self.records) - self.maxsize if self.maxsize else 0
+        if excess <= 0:
+            return
+        # The newest record is whatever the current command is working on
+        newest = next(reversed(self.records))
+        victims = []
+        for record_id in self.records:
+            if len(victims) >= excess:
+                break
+            if record_id not in self.dirty and record_id != newest:
+                victims.append(record_id)
+        for record_id in victims:
+            del self.records[record_id]
+        self.evictions += len(victims)
+        if len(victims) < excess and self.on_overflow:
+            # Only unsaved records left to evict; ask for a flush
+            self.on_overflow()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.records),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,135 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import time
+import hooks
+from config import PROFILE_DIR
+
+# Opt-in command profiler.
+#
+# An admin picks commands to profile (!profiler on expedition) or a share of
+# all commands (!profiler rate 0.01). Picked invocations run under cProfile
+# between the bot's before_invoke and after_invoke hooks, their stats are
+# added to one running pstats.Stats, and !profiler dump writes that out as a
+# .prof file (snakeviz, pstats) plus a collapsed-stack .folded file for
+# flamegraph.pl / speedscope.
+#
+# Only one invocation is profiled at a time; others that would have been
+# picked meanwhile are counted as skipped. Anything else the event loop runs
+# while a profiled command awaits shows up in its profile too.
+
+class Profiler:
+    def __init__(self):
+        self.commands = set()
+        self.rate = 0.0
+        self.stats = None
+        self.samples = {}     # command: profiled invocations
+        self.skipped = 0
+        self._profile = None
+        self._ctx = None
+
+    @property
+    def active(self):
+        return bool(self.commands or self.rate)
+
+    def wants(self, name):
+        return name in self.commands or (self.rate and random.random() < self.rate)
+
+    def start(self, ctx):
+        if not self.active or not self.wants(ctx.command.qualified_name):
+            return
+        if self._profile is not None:
+            self.skipped += 1
+            return
+        self._ctx = ctx
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self, ctx):
+        if self._ctx is not ctx:
+            return
+        self._profile.disable()
+        if self.stats is None:
+            self.stats = pstats.Stats(self._profile)
+        else:
+            self.stats.add(self._profile)
+        name = ctx.command.qualified_name
+        self.samples[name] = self.samples.get(name, 0) + 1
+        self._profile = self._ctx = None
+
+    def install(self):
+        hooks.before_invoke(self.start)
+        hooks.after_invoke(self.stop)
+
+    def reset(self):
+        self.stats = None
+        self.samples.clear()
+        self.skipped = 0
+
+    def top(self, limit=10, sort="cumulative"):
+        """The `limit` heaviest functions as pstats prints them."""
+        if self.stats is None:
+            return ""
+        out = io.StringIO()
+        self.stats.stream = out
+        self.stats.sort_stats(sort).print_stats(limit)
+        self.stats.stream = None
+        # Drop the header, keep the table
+        text = out.getvalue()
+        return text[text.find("   ncalls"):].rstrip()
+
+    def dump(self, directory=PROFILE_DIR):
+        """Writes the aggregate as .prof and .folded files. Returns their paths."""
+        if self.stats is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, time.strftime("commands-%Y%m%d-%H%M%S"))
+        self.stats.dump_stats(base + ".prof")
+        with open(base + ".folded", "w") as f:
+            for stack, micros in sorted(collapsed_stacks(self.stats).items()):
+                f.write(f"{stack} {micros}\n")
+        return base + ".prof", base + ".folded"
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name  # builtins look like "<built-in method time.sleep>"
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+def collapsed_stacks(stats, max_depth=64):
+    """{"root;caller;callee": self time in µs} rebuilt from a pstats call graph.
+
+    cProfile only records caller -> callee edges, not whole stacks, so a
+    function's time is split between its callers in proportion to the time
+    each edge accounts for. Good enough to see where time goes on a flamegraph.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    stacks = {}
+
+    def walk(func, path, share):
+        self_time = stats.stats[func][2]
+        path = path + (func,)
+        micros = int(self_time * share * 1e6)
+        if micros:
+            key = ";".join(_label(f) for f in path)
+            stacks[key] = stacks.get(key, 0) + micros
+        if len(path) >= max_depth:
+            return
+        for callee, edge_time in callees.get(func, ()):
+            callee_total = stats.stats[callee][3]
+            if callee in path or not callee_total:
+                continue
+            walk(callee, path, share * edge_time / callee_total)
+
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        if not callers:
+            walk(func, (), 1.0)
+    return stacks
+
+profiler = Profiler()
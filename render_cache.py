@@ -0,0 +1,44 @@
+from collections import OrderedDict
+from content import on_reload
+
+# Prebuilt replies for the informational commands (!help, !pathways,
+# !recipes, !item). Their output only depends on the static content, so each
+# reply is built once per key and served as-is until the content is reloaded.
+
+class RenderCache:
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """The send() kwargs cached under `key`, building them with build() on a miss."""
+        payload = self.entries.get(key)
+        if payload is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return payload
+        self.misses += 1
+        payload = self.entries[key] = build()
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+render_cache = RenderCache()
+
+@on_reload
+def _invalidate(changed):
+    render_cache.clear()
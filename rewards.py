@@ -0,0 +1,119 @@
+import sys
+from bisect import bisect_right
+
+# Reward rules.
+#
+# The numbers behind !work, !daily, !expedition, !act, !casino and !advance
+# live here so the cogs and the balance simulator (simulator.py) roll the
+# same dice. Every roll goes through `rng`, which is either the `random`
+# module / a random.Random, giving one outcome as plain ints, or a NumPy
+# Generator with `size=n`, giving n outcomes as arrays. NumPy is never
+# imported here: if nobody else has imported it there can be no arrays.
+
+WORK_REWARD = (10, 20)
+WORK_XP = 5
+
+DAILY_REWARD = 120
+DAILY_XP = 50
+DAILY_ACTING = 15
+
+EXPEDITION_SUCCESS = 0.7
+EXPEDITION_REWARD = (120, 480)
+EXPEDITION_XP = (20, 40)
+EXPEDITION_ACTING = (5, 15)
+EXPEDITION_SANITY_LOSS = (3, 5)
+# A failure costs 6 to 20 sanity, skewed towards the low end; 18+ is critical
+EXPEDITION_FAIL_LOSS = (6, 14)
+EXPEDITION_CRITICAL = 18
+
+# Acts needed for each mastery level: 0 -> 1 after 3 acts, 1 -> 2 after 7...
+MASTERY_THRESHOLDS = [3, 7, 15, 30, 50]
+ACT_GAIN = (20, 35)
+ACT_MASTERY_BONUS = 0.5  # +50% acting XP per mastery level
+
+CASINO_DICE = (2, 12)
+
+# Advancing with fully digested acting is safer
+ADVANCE_SANITY_LOSS = (20, 75)
+ADVANCE_SANITY_LOSS_DIGESTED = (10, 35)
+
+def _vectorized(rng):
+    return hasattr(rng, "integers")
+
+def randint(rng, low, high, size=None):
+    """Inclusive on both ends, like random.randint."""
+    if _vectorized(rng):
+        return rng.integers(low, high + 1, size)
+    return rng.randint(low, high)
+
+def uniform(rng, size=None):
+    if _vectorized(rng):
+        return rng.random(size)
+    return rng.random()
+
+def _numpy(value):
+    """The numpy module if `value` is an array, else None."""
+    np = sys.modules.get("numpy")
+    return np if np is not None and isinstance(value, np.ndarray) else None
+
+def _where(condition, yes, no):
+    np = _numpy(condition)
+    if np is not None:
+        return np.where(condition, yes, no)
+    return yes if condition else no
+
+def _floor(value):
+    np = _numpy(value)
+    if np is not None:
+        return value.astype(np.int64)
+    return int(value)
+
+
+def work(rng, size=None):
+    """(pence, xp) for one !work."""
+    return randint(rng, *WORK_REWARD, size), WORK_XP
+
+def expedition(rng, size=None):
+    """One !expedition: {success, critical, reward, xp, acting, sanity_loss}.
+
+    Reward, xp and acting are 0 on a failure.
+    """
+    success = uniform(rng, size) < EXPEDITION_SUCCESS
+    reward = randint(rng, *EXPEDITION_REWARD, size)
+    xp = randint(rng, *EXPEDITION_XP, size)
+    acting = randint(rng, *EXPEDITION_ACTING, size)
+    base, spread = EXPEDITION_FAIL_LOSS
+    fail_loss = base + _floor(spread * uniform(rng, size) ** 2)
+    return {
+        "success": success,
+        "critical": _where(success, False, fail_loss >= EXPEDITION_CRITICAL),
+        "reward": _where(success, reward, 0),
+        "xp": _where(success, xp, 0),
+        "acting": _where(success, acting, 0),
+        "sanity_loss": _where(success, randint(rng, *EXPEDITION_SANITY_LOSS, size), fail_loss),
+    }
+
+def mastery_level(mastery):
+    """How many MASTERY_THRESHOLDS a count of acts has reached."""
+    np = _numpy(mastery)
+    if np is not None:
+        return np.searchsorted(MASTERY_THRESHOLDS, mastery, side="right")
+    return bisect_right(MASTERY_THRESHOLDS, mastery)
+
+def act_gain(rng, mastery, size=None):
+    """Acting XP for one !act by a player with `mastery` acts at this sequence."""
+    base = randint(rng, *ACT_GAIN, size)
+    return base + _floor(base * (mastery_level(mastery) * ACT_MASTERY_BONUS))
+
+def casino(rng, size=None):
+    """(player roll, Will's roll); the higher one wins the bet, a tie is a draw."""
+    return randint(rng, *CASINO_DICE, size), randint(rng, *CASINO_DICE, size)
+
+def advance_sanity_loss(rng, digested, size=None):
+    """Sanity lost drinking the next potion; `digested` means acting XP was full."""
+    return _where(digested, randint(rng, *ADVANCE_SANITY_LOSS_DIGESTED, size),
+                  randint(rng, *ADVANCE_SANITY_LOSS, size))
+
+def acting_max_xp(sequence):
+    """Acting XP needed to digest the potion of `sequence`."""
+    return 200 + (9 - sequence) * 100
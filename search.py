@@ -0,0 +1,108 @@
+import re
+from difflib import SequenceMatcher
+from content import on_reload
+from data_manager import items_db, pathways_db, recipes_db
+
+# Name lookups for items, pathways and recipes.
+#
+# Each catalog gets a NameIndex when the content is loaded: an exact map of
+# normalized names, a prefix trie for autocomplete (every word of a name is a
+# valid starting point, so "rose" finds "Human-faced Rose") and a trigram
+# index that narrows "did you mean" candidates before fuzzy scoring. None of
+# the lookups scan the catalog.
+
+MAX_CHOICES = 25  # Discord's autocomplete limit
+
+def normalize(name):
+    # Case, spacing and punctuation don't matter: "human-faced  ROSE" == "human_faced_rose"
+    return " ".join(re.sub(r"[\W_]+", " ", name.casefold()).split())
+
+def _trigrams(text):
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class NameIndex:
+    def __init__(self, names):
+        self.rebuild(names)
+
+    def rebuild(self, names):
+        """`names` maps each key to the names it can be found by; the first is its display name."""
+        display, exact, trie, trigrams = {}, {}, {}, {}
+        for key, aliases in names.items():
+            display[key] = aliases[0]
+            for alias in aliases:
+                self._add(exact, trie, trigrams, key, normalize(alias))
+        # Swap everything in at once so a lookup never sees a half-built index
+        self.display, self.exact, self.trie, self.trigrams = display, exact, trie, trigrams
+
+    @staticmethod
+    def _add(exact, trie, trigrams, key, name):
+        exact.setdefault(name, key)
+        for gram in _trigrams(name):
+            trigrams.setdefault(gram, set()).add(key)
+        # Index the name from the start of every word
+        for match in re.finditer(r"\w+", name):
+            node = trie
+            for char in name[match.start():]:
+                node = node.setdefault(char, {})
+                # Each node keeps its first completions so a lookup never walks the subtree
+                keys = node.setdefault("", [])
+                if len(keys) < MAX_CHOICES and key not in keys:
+                    keys.append(key)
+
+    def find(self, name):
+        """Key of an exact (case/space-insensitive) name match, or None."""
+        return self.exact.get(normalize(name))
+
+    def complete(self, prefix, limit=MAX_CHOICES):
+        """Keys whose name, or any word in it, starts with `prefix`."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return list(self.display)[:limit]
+        node = self.trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return node[""][:limit]
+
+    def suggest(self, name, limit=3, cutoff=0.6):
+        """Closest keys to a misspelled name, best first."""
+        name = normalize(name)
+        shared = {}
+        for gram in _trigrams(name):
+            for key in self.trigrams.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:limit * 4]
+        scored = []
+        for key in candidates:
+            ratio = SequenceMatcher(None, name, normalize(self.display[key])).ratio()
+            if ratio >= cutoff:
+                scored.append((ratio, key))
+        scored.sort(reverse=True)
+        return [key for _, key in scored[:limit]]
+
+    def name(self, key):
+        return self.display[key]
+
+def item_names():
+    return {item_id: [item["name"], item_id] for item_id, item in items_db.items()}
+
+def pathway_names():
+    return {name: [name] for name in pathways_db}
+
+def recipe_names():
+    # Recipes are keyed by (category, recipe_id)
+    return {(category, recipe_id): [recipe["name"], recipe_id]
+            for category, recipes in recipes_db.items()
+            for recipe_id, recipe in recipes.items()}
+
+item_index = NameIndex(item_names())
+pathway_index = NameIndex(pathway_names())
+recipe_index = NameIndex(recipe_names())
+
+@on_reload
+def _rebuild_indexes(changed):
+    if "items" in changed: item_index.rebuild(item_names())
+    if "pathways" in changed: pathway_index.rebuild(pathway_names())
+    if "recipes" in changed: recipe_index.rebuild(recipe_names())
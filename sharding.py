@@ -0,0 +1,117 @@
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+# Sharded deployment.
+#
+# Discord assigns every guild to one of SHARD_COUNT gateway shards
+# (shard_for). A worker is one bot process serving a range of those shards as
+# an AutoShardedBot; the launcher below splits the shards between a number of
+# workers on this machine and keeps them running. All workers share the
+# sqlite player store (see the sharding settings in config.py).
+#
+#   python sharding.py --shards 8 --workers 4
+#
+# Each worker gets SHARD_COUNT, SHARD_IDS and WORKER_ID in its environment,
+# and METRICS_PORT + its index when METRICS_PORT is set.
+
+def shard_for(guild_id, shard_count):
+    """The shard Discord delivers a guild's events on."""
+    return (guild_id >> 22) % shard_count
+
+def parse_shard_ids(text, shard_count):
+    """"0-3,6" -> [0, 1, 2, 3, 6]; empty means every shard."""
+    if not text.strip():
+        return list(range(shard_count))
+    ids = set()
+    for part in text.split(","):
+        first, _, last = part.strip().partition("-")
+        ids.update(range(int(first), int(last or first) + 1))
+    if not ids or min(ids) < 0 or max(ids) >= shard_count:
+        raise ValueError(f"Shard ids {text!r} don't fit {shard_count} shards")
+    return sorted(ids)
+
+def format_shard_ids(ids):
+    """The inverse of parse_shard_ids, with runs collapsed."""
+    parts = []
+    for shard in sorted(ids):
+        if parts and parts[-1][1] == shard - 1:
+            parts[-1][1] = shard
+        else:
+            parts.append([shard, shard])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in parts)
+
+def shard_ranges(shard_count, workers):
+    """Splits the shards into `workers` contiguous, near-equal ranges."""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        end = start + size + (i < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+def worker_env(index, shard_count, shard_ids, base=None):
+    env = dict(os.environ if base is None else base)
+    env.update({
+        "SHARD_COUNT": str(shard_count),
+        "SHARD_IDS": format_shard_ids(shard_ids),
+        "WORKER_ID": f"worker{index}",
+        "STORAGE_BACKEND": "sqlite",
+    })
+    if int(env.get("METRICS_PORT") or 0):
+        env["METRICS_PORT"] = str(int(env["METRICS_PORT"]) + index)
+    return env
+
+
+def launch(shard_count, workers, command, restart_delay=5):
+    """Runs one worker process per shard range until interrupted, restarting any that die."""
+    ranges = shard_ranges(shard_count, workers)
+    procs = {}
+
+    def start(index):
+        print(f"🚀 worker{index}: shards {format_shard_ids(ranges[index])} of {shard_count}")
+        procs[index] = subprocess.Popen(command, env=worker_env(index, shard_count, ranges[index]))
+
+    stopping = False
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    signal.signal(signal.SIGTERM, stop)
+
+    for index in range(len(ranges)):
+        start(index)
+    try:
+        while not stopping:
+            time.sleep(1)
+            for index, proc in list(procs.items()):
+                if proc.poll() is not None:
+                    print(f"⚠️ worker{index} exited with {proc.returncode}, restarting in {restart_delay}s")
+                    time.sleep(restart_delay)
+                    start(index)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Workers flush on SIGINT like a single bot on ctrl-c
+        for proc in procs.values():
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGINT)
+        for proc in procs.values():
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the bot as several sharded worker processes.")
+    parser.add_argument("--shards", type=int, required=True, help="total shard count")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    if os.getenv("STORAGE_BACKEND", "sqlite") != "sqlite":
+        sys.exit("❌ Sharded workers share the sqlite store; unset STORAGE_BACKEND or set it to sqlite.")
+    here = os.path.dirname(os.path.abspath(__file__))
+    launch(args.shards, args.workers, [sys.executable, os.path.join(here, "Fully_Automatic_Wishing_Machine.py")])
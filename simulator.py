@@ -0,0 +1,175 @@
+import argparse
+import time
+
+import numpy as np
+
+import rewards
+from leveling import xp_curve
+
+# Monte Carlo balance simulator.
+#
+# Plays a population of players forward day by day with the reward rules in
+# rewards.py, one NumPy array per player attribute, so each command of each
+# day is a handful of whole-array operations however many players there are.
+# Runs are seeded and reproducible.
+#
+#   python simulator.py --players 10000 --days 365 --seed 1
+#
+# Every simulated player has a pathway (picked uniformly) and follows the
+# same routine each day: !daily, a number of !work, !expedition and !act,
+# maybe a !casino bet, and !advance as soon as their acting is digested.
+# Potions are assumed to be at hand; a pathway's progress stops where its
+# sequence data ends.
+
+def pathway_floors(pathways):
+    """{pathway: lowest sequence reachable}, following the sequences defined from 9 down."""
+    floors = {}
+    for name, pathway in pathways.items():
+        sequences = pathway.get("sequences", {})
+        floor = 9
+        while floor > 0 and str(floor - 1) in sequences:
+            floor -= 1
+        floors[name] = floor
+    return floors
+
+def levels_for(total_xp):
+    """Vectorized leveling.xp_curve.level_for."""
+    xp_curve.level_for(int(total_xp.max()))
+    return np.searchsorted(np.array(xp_curve.totals, dtype=np.float64), total_xp, side="right") - 1
+
+def _snapshot(day, balance, total_xp, sanity, sequence, bankroll):
+    return {
+        "day": day,
+        "balance_mean": float(balance.mean()),
+        "balance_median": float(np.median(balance)),
+        "balance_p90": float(np.percentile(balance, 90)),
+        "level_mean": float(levels_for(total_xp).mean()),
+        "sanity_mean": float(sanity.mean()),
+        "sanity_broken": float((sanity <= 0).mean()),
+        "sequence_mean": float(sequence.mean()),
+        "will_bankroll": int(bankroll),
+    }
+
+def simulate(pathways, players=10000, days=365, seed=0, works=4, expeditions=4, acts=2,
+             casino_rate=0.2, casino_stake=0.1, checkpoints=12):
+    """Runs the simulation and returns {"trajectory": [...], "sequences": {...}}.
+
+    `pathways` is {name: floor sequence} (see pathway_floors). Each day every
+    player does `works` !work, `expeditions` !expedition and `acts` !act;
+    with probability `casino_rate` they also bet `casino_stake` of their balance.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(pathways)
+    floors = np.array([pathways[n] for n in names])
+    pathway = rng.integers(len(names), size=players)
+    floor = floors[pathway]
+
+    balance = np.full(players, 120, dtype=np.int64)
+    total_xp = np.zeros(players, dtype=np.int64)
+    sanity = np.full(players, 100, dtype=np.int64)
+    sequence = np.full(players, 9, dtype=np.int64)
+    acting = np.zeros(players, dtype=np.int64)
+    acting_max = np.full(players, rewards.acting_max_xp(9), dtype=np.int64)
+    mastery = np.zeros(players, dtype=np.int64)
+    reached = np.full((players, 10), -1, dtype=np.int64)  # day each sequence was reached
+    reached[:, 9] = 0
+    bankroll = 0
+
+    every = max(1, days // checkpoints)
+    trajectory = [_snapshot(0, balance, total_xp, sanity, sequence, bankroll)]
+    for day in range(1, days + 1):
+        balance += rewards.DAILY_REWARD
+        total_xp += rewards.DAILY_XP
+        np.minimum(acting + rewards.DAILY_ACTING, acting_max, out=acting)
+
+        for _ in range(works):
+            reward, xp = rewards.work(rng, players)
+            balance += reward
+            total_xp += xp
+
+        for _ in range(expeditions):
+            outcome = rewards.expedition(rng, players)
+            balance += outcome["reward"]
+            total_xp += outcome["xp"]
+            np.minimum(acting + outcome["acting"], acting_max, out=acting)
+            np.maximum(sanity - outcome["sanity_loss"], 0, out=sanity)
+
+        for _ in range(acts):
+            np.minimum(acting + rewards.act_gain(rng, mastery, players), acting_max, out=acting)
+            mastery += 1
+
+        if casino_rate:
+            gamblers = rng.random(players) < casino_rate
+            bet = (balance * casino_stake).astype(np.int64) * gamblers
+            p_roll, w_roll = rewards.casino(rng, players)
+            delta = np.where(p_roll > w_roll, bet, np.where(p_roll < w_roll, -bet, 0))
+            balance += delta
+            bankroll += int(-delta[delta < 0].sum())
+
+        advancing = (acting >= acting_max) & (sequence > floor)
+        if advancing.any():
+            loss = rewards.advance_sanity_loss(rng, True, players)
+            sanity = np.where(advancing, np.maximum(sanity - loss, 0), sanity)
+            sequence -= advancing
+            acting[advancing] = 0
+            mastery[advancing] = 0
+            acting_max = np.where(advancing, rewards.acting_max_xp(sequence), acting_max)
+            reached[advancing, sequence[advancing]] = day
+
+        if day % every == 0 or day == days:
+            trajectory.append(_snapshot(day, balance, total_xp, sanity, sequence, bankroll))
+
+    sequences = {}
+    for i, name in enumerate(names):
+        cohort = reached[pathway == i]
+        if not len(cohort):
+            continue
+        stats = {}
+        for seq in range(8, pathways[name] - 1, -1):
+            days_to = cohort[:, seq]
+            done = days_to[days_to >= 0]
+            stats[seq] = {"reached": float(len(done) / len(cohort)),
+                          "median_day": float(np.median(done)) if len(done) else None}
+        sequences[name] = {"players": int(len(cohort)), "floor": pathways[name], "by_sequence": stats}
+    return {"trajectory": trajectory, "sequences": sequences}
+
+def format_result(result):
+    lines = ["day   balance(mean/median/p90)     level  sanity  broken  seq   Will's bankroll"]
+    for t in result["trajectory"]:
+        lines.append(f"{t['day']:>4}  {t['balance_mean']:>9.0f} {t['balance_median']:>8.0f} {t['balance_p90']:>8.0f}"
+                     f"  {t['level_mean']:>6.1f}  {t['sanity_mean']:>6.1f}  {t['sanity_broken']:>5.1%}  {t['sequence_mean']:>4.2f}"
+                     f"  {t['will_bankroll']:>12}")
+    lines.append("")
+    lines.append("Time to sequence (median day, share reached):")
+    for name, p in sorted(result["sequences"].items()):
+        if not p["by_sequence"]:
+            lines.append(f"  {name} ({p['players']} players): no sequences past 9 defined")
+            continue
+        steps = ", ".join(f"S{seq} {s['median_day']:.0f}d {s['reached']:.0%}" if s["median_day"] is not None else f"S{seq} never"
+                          for seq, s in p["by_sequence"].items())
+        lines.append(f"  {name} ({p['players']} players): {steps}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    from catalog import load_content
+    parser = argparse.ArgumentParser(description="Simulate the long-run effect of the reward rules.")
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--works", type=int, default=4, help="!work per day")
+    parser.add_argument("--expeditions", type=int, default=4, help="!expedition per day (at most 8)")
+    parser.add_argument("--acts", type=int, default=2, help="!act per day (at most 2)")
+    parser.add_argument("--casino-rate", type=float, default=0.2, help="chance a player gambles on a given day")
+    parser.add_argument("--casino-stake", type=float, default=0.1, help="share of the balance bet")
+    parser.add_argument("--pathways", nargs="*", help="only simulate these pathways")
+    args = parser.parse_args()
+
+    floors = pathway_floors(load_content()["pathways"])
+    if args.pathways:
+        floors = {name: floor for name, floor in floors.items() if name in args.pathways}
+    start = time.perf_counter()
+    result = simulate(floors, args.players, args.days, args.seed, args.works, args.expeditions, args.acts,
+                      args.casino_rate, args.casino_stake)
+    elapsed = time.perf_counter() - start
+    print(format_result(result))
+    print(f"\n{args.players * args.days:,} player-days in {elapsed:.2f}s")
@@ -0,0 +1,51 @@
+import time
+from contextlib import contextmanager
+
+# Cold start timing.
+#
+# The entry script imports this module before anything else, so `started`
+# is about when the process got going. Each phase of the start (imports,
+# content, players, extensions, gateway) is timed relative to it; some run
+# side by side, so the phases can add up to more than the total, which is
+# the wall time until the gateway is ready. report() lays them out and
+# flags a start slower than STARTUP_TARGET.
+
+started = time.perf_counter()
+
+class StartupTimer:
+    def __init__(self, origin=started):
+        self.origin = origin
+        self.phases = {}   # name: (start, end), seconds since origin
+        self.ready = None
+
+    def mark(self, name, since=None):
+        """Records a phase that began at `since` (a perf_counter time, default the origin) and ended now."""
+        start = (since if since is not None else self.origin) - self.origin
+        self.phases[name] = (start, time.perf_counter() - self.origin)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, start)
+
+    def finish(self):
+        """Stops the clock (on the first gateway ready). Returns False if it was already stopped."""
+        if self.ready is not None:
+            return False
+        self.ready = time.perf_counter() - self.origin
+        return True
+
+    def report(self, target=0):
+        total = self.ready if self.ready is not None else time.perf_counter() - self.origin
+        lines = [f"⏱️ Started in {total:.2f}s"
+                 + (f" (target {target:g}s)" if target else "")]
+        for name, (start, end) in sorted(self.phases.items(), key=lambda kv: kv[1]):
+            lines.append(f"   {name:<11}{(end - start) * 1000:>8.0f} ms   [{start:6.2f}s → {end:6.2f}s]")
+        if target and total > target:
+            lines.append(f"   ⚠️ Over the {target:g}s startup target by {total - target:.2f}s")
+        return "\n".join(lines)
+
+timer = StartupTimer()
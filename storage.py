@@ -0,0 +1,297 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from config import DB_FILE, SQLITE_FILE, STORAGE_BACKEND, SQLITE_BUSY_TIMEOUT
+
+def write_atomic(filename, text):
+    # Write next to the target then rename over it, so a crash mid-write
+    # never leaves a truncated file behind.
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def encode_record(obj):
+    # json `default` hook: Player objects serialize to their stored dict shape
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# Storage backends for player records.
+#
+# Flushing is split in two so the event loop only does the part that touches
+# live player dicts: prepare() runs on the loop and turns the dirty records into
+# a payload, write() then persists that payload from a worker thread.
+
+class StaleWrite(Exception):
+    """Another process changed these records since this one last read them."""
+    def __init__(self, record_ids):
+        super().__init__(f"changed by another worker: {', '.join(record_ids)}")
+        self.record_ids = record_ids
+
+class JsonStore:
+    """Every record in one JSON file. Each write rewrites the whole file.
+
+    The file is assembled from each record's encoded JSON, kept from one
+    prepare() to the next, so a flush only encodes the dirty records (and
+    any it hasn't seen yet) on the loop. The payload is the list of those
+    pieces; write() joins them in the worker thread.
+    """
+    name = "json"
+    partial_loads = False
+
+    def __init__(self, filename=DB_FILE, writer=None):
+        if writer is not None:
+            raise ValueError("The json store can't be shared between processes; use sqlite")
+        self.filename = filename
+        self._encoded = {}   # record_id: '"record_id":{...}'
+
+    def _read(self):
+        # Unlike the content files, a database that fails to parse is an error:
+        # treating it as empty would wipe everyone on the next flush.
+        if not os.path.exists(self.filename):
+            return {}
+        with open(self.filename, 'r') as f:
+            return json.load(f)
+
+    def load_all(self):
+        records = self._read()
+        # Encoded here, usually in the loading thread, rather than by the
+        # first flush on the loop. Records upgraded on load are dirty anyway.
+        self._encoded = {}
+        for record_id, record in records.items():
+            self._encode(record_id, record)
+        return records
+
+    def load(self, record_id):
+        return self._read().get(record_id)
+
+    def _encode(self, record_id, record):
+        # Compact separators keep json on its C encoder; indent=4 falls back to
+        # the pure Python one and is several times slower on a big database.
+        self._encoded[record_id] = (json.dumps(record_id) + ":"
+                                    + json.dumps(record, separators=(',', ':'), default=encode_record))
+
+    def prepare(self, records, dirty_ids):
+        encoded = self._encoded
+        removed = False
+        for record_id in dirty_ids:
+            if record_id in records:
+                self._encode(record_id, records[record_id])
+            else:
+                removed = True
+        # Records are only ever added clean (a new player nobody changed yet)
+        # or dropped dirty, never evicted, so the counts tell when to look
+        if removed or len(encoded) != len(records):
+            for record_id in records.keys() - encoded.keys():
+                self._encode(record_id, records[record_id])
+            for record_id in encoded.keys() - records.keys():
+                del encoded[record_id]
+        return list(encoded.values())
+
+    def write(self, payload):
+        write_atomic(self.filename, "{" + ",".join(payload) + "}")
+
+    def payload_bytes(self, payload):
+        return sum(len(piece) for piece in payload) + len(payload) + 1
+
+    def clear(self):
+        self._encoded.clear()
+        self.write([])
+
+    def close(self):
+        pass
+
+
+class SqliteStore:
+    """One row per player (and NPC) in an SQLite database in WAL mode.
+
+    With a `writer` name the store is shared: several processes may write to
+    it, and each write is logged in the changes table under that name so the
+    other processes can tell which of their cached records went stale.
+    """
+    name = "sqlite"
+    partial_loads = True
+    # Ids per stale check query, well under SQLite's limit on bound parameters
+    CHECK_BATCH = 500
+
+    def __init__(self, filename=SQLITE_FILE, writer=None):
+        self.filename = filename
+        self.writer = writer
+        self._lock = threading.Lock()
+        # Writes happen from asyncio.to_thread workers, reads from the loop.
+        # `timeout` is how long a write waits on another process's lock.
+        self.conn = sqlite3.connect(filename, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS players (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS changes "
+                          "(seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL, writer TEXT NOT NULL, at REAL NOT NULL)")
+        self.conn.commit()
+
+    def load_all(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT id, data FROM players").fetchall()
+        return {record_id: json.loads(data) for record_id, data in rows}
+
+    def load(self, record_id):
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM players WHERE id = ?", (record_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def prepare(self, records, dirty_ids):
+        return [(record_id, json.dumps(records[record_id], separators=(',', ':'), default=encode_record))
+                for record_id in dirty_ids if record_id in records]
+
+    def _upsert(self, payload):
+        self.conn.executemany(
+            "INSERT INTO players (id, data) VALUES (?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+            payload)
+        if self.writer is not None:
+            self._log([record_id for record_id, _ in payload])
+
+    def _log(self, record_ids):
+        at = time.time()
+        self.conn.executemany("INSERT INTO changes (id, writer, at) VALUES (?, ?, ?)",
+                              [(record_id, self.writer, at) for record_id in record_ids])
+
+    def write(self, payload):
+        if not payload:
+            return
+        with self._lock, self.conn:
+            self._upsert(payload)
+
+    def write_checked(self, payload, since):
+        """write(), unless another writer changed one of the records after change `since`.
+
+        Raises StaleWrite and writes nothing in that case.
+        """
+        if not payload:
+            return
+        record_ids = [record_id for record_id, _ in payload] + ["*"]
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so nobody can slip a
+            # change in between the check and the write
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                stale = []
+                for start in range(0, len(record_ids), self.CHECK_BATCH):
+                    batch = record_ids[start:start + self.CHECK_BATCH]
+                    stale += [row[0] for row in self.conn.execute(
+                        f"SELECT DISTINCT id FROM changes WHERE seq > ? AND writer != ? "
+                        f"AND id IN ({','.join('?' * len(batch))})",
+                        (since, self.writer, *batch))]
+                if stale:
+                    raise StaleWrite(stale)
+                self._upsert(payload)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def increment(self, record_id, amounts, default):
+        """Adds {field: amount} to a stored record's numbers in place, starting from `default` if it's missing.
+
+        Not checked against other writers: increments commute, so one landing
+        after another worker's changes can't undo them. The change is still
+        logged so the others drop their cached copy.
+        """
+        # Field names come from the code, never from users
+        data = "data"
+        for field in amounts:
+            data = f"json_set({data}, '$.{field}', COALESCE(json_extract(data, '$.{field}'), 0) + ?)"
+        with self._lock, self.conn:
+            self.conn.execute("INSERT INTO players (id, data) VALUES (?, ?) ON CONFLICT(id) DO NOTHING",
+                              (record_id, json.dumps(default, separators=(',', ':'))))
+            self.conn.execute(f"UPDATE players SET data = {data} WHERE id = ?", (*amounts.values(), record_id))
+            if self.writer is not None:
+                self._log([record_id])
+
+    def last_change(self):
+        with self._lock:
+            row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def changes_since(self, since):
+        """(last change, ids other writers changed after `since`).
+
+        The ids are None if the log no longer reaches back to `since`, and
+        "*" is among them if the store was cleared.
+        """
+        with self._lock:
+            oldest = self.conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            rows = self.conn.execute("SELECT seq, id, writer FROM changes WHERE seq > ? ORDER BY seq",
+                                     (since,)).fetchall()
+        last = rows[-1][0] if rows else since
+        if oldest is None:
+            # Pruned empty: only the sequence tells whether anything happened
+            last = self.last_change()
+            return last, (None if last > since else set())
+        if since < oldest - 1:
+            return last, None
+        return last, {record_id for _, record_id, writer in rows if writer != self.writer}
+
+    def prune_changes(self, older_than):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM changes WHERE at < ?", (older_than,))
+
+    def payload_bytes(self, payload):
+        return sum(len(data) for _, data in payload)
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM players")
+            if self.writer is not None:
+                self._log(["*"])
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+BACKENDS = {
+    "json": JsonStore,
+    "sqlite": SqliteStore,
+}
+
+def open_store(backend=STORAGE_BACKEND, writer=None):
+    """The configured store; give a `writer` name to share it with other processes."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[backend](writer=writer)
+
+def migrate_json_to_sqlite(json_file=DB_FILE, sqlite_file=SQLITE_FILE):
+    """One-shot copy of every record in the JSON database into SQLite."""
+    if not os.path.exists(json_file):
+        raise FileNotFoundError(json_file)
+    with open(json_file, 'r') as f:
+        records = json.load(f)
+    store = SqliteStore(sqlite_file)
+    try:
+        store.write(store.prepare(records, records.keys()))
+    finally:
+        store.close()
+    return len(records)
+
+if __name__ == "__main__":
+    # python storage.py migrate [data.json] [data.db]
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python storage.py migrate [json_file] [sqlite_file]")
+        sys.exit(1)
+    json_file = sys.argv[2] if len(sys.argv) > 2 else DB_FILE
+    sqlite_file = sys.argv[3] if len(sys.argv) > 3 else SQLITE_FILE
+    count = migrate_json_to_sqlite(json_file, sqlite_file)
+    print(f"✅ Migrated {count} records from {json_file} to {sqlite_file}")
@@ -0,0 +1,115 @@
+import asyncio
+import copy
+from contextlib import asynccontextmanager
+import data_manager
+from data_manager import get_player, get_npc, mark_dirty, player_data, sync, write_through
+from migrations import is_player_id
+
+# Transactional record updates.
+#
+#   async with player_tx(ctx.author.id) as player:
+#       ...
+#   async with transaction(ctx.author.id, target.id) as (player, other):
+#       ...
+#
+# A transaction holds the locks of its records for the duration of the
+# block, so two commands of the same player (or a command and a button
+# press) can't interleave across an await, while commands of different
+# players still run side by side. Records hash onto a fixed set of lock
+# stripes, which are always taken in ascending order so multi-record
+# transactions can't deadlock. On the way in each record is snapshotted; if
+# the block raises, every record is put back as it was, otherwise only the
+# records that actually changed are handed to mark_dirty().
+#
+# Commands build their reply inside the block and send it after: the
+# change is only kept once the block exits, and sending after also keeps a
+# slow reply from holding the lock. A block that changed nothing can't be
+# refused, so an early "not yet" reply may go out from inside it.
+#
+# Sharded workers (data_manager.SHARED) also sync the cache with the other
+# workers before fetching the records, and write the changed ones through
+# before releasing the locks, in place of mark_dirty(). If another worker
+# changed one of them in the meantime the write is refused with
+# storage.StaleWrite, the records are put back as they were and the error
+# propagates like any other. Commands are wrapped in utils.retry_stale(),
+# which runs them again on fresh records.
+#
+# Locks aren't reentrant: don't open a transaction on a record from inside
+# another one that already holds it.
+#
+# Side effects that must only happen once the change is kept (indexing a
+# cooldown for its reminder...) register with on_commit(); they're called
+# with the changed records after the commit, and never for a rolled back
+# block.
+
+LOCK_STRIPES = 1024
+_locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
+_commit_listeners = []
+
+def on_commit(callback):
+    """Registers callback(changed), called with {record_id: record} after each commit that changed something."""
+    _commit_listeners.append(callback)
+    return callback
+
+def _stripe(record_id):
+    return hash(record_id) % LOCK_STRIPES
+
+def _fetch(record_id, create):
+    if is_player_id(record_id):
+        return get_player(record_id, create=create)
+    return get_npc(record_id)
+
+def _snapshot(record):
+    if record is None:
+        return None
+    return copy.deepcopy(record.to_dict() if hasattr(record, "to_dict") else record)
+
+def _restore(record, snapshot):
+    if hasattr(record, "restore"):
+        record.restore(snapshot)
+    else:
+        record.clear()
+        record.update(snapshot)
+
+@asynccontextmanager
+async def transaction(*record_ids, create=True):
+    """Locks, snapshots and yields the records (a list, in the order given).
+
+    Players that don't exist are created, or yielded as None with create=False.
+    """
+    record_ids = [str(record_id) for record_id in record_ids]
+    stripes = sorted({_stripe(record_id) for record_id in record_ids})
+    for stripe in stripes:
+        await _locks[stripe].acquire()
+    try:
+        since, _ = sync()
+        records = [_fetch(record_id, create) for record_id in record_ids]
+        before = [_snapshot(record) for record in records]
+        try:
+            yield records
+            changed = {record_id: record for record_id, record, snapshot in zip(record_ids, records, before)
+                       if record is not None and _snapshot(record) != snapshot}
+            if changed and data_manager.SHARED:
+                await write_through(changed, since)
+        except BaseException:
+            for record, snapshot in zip(records, before):
+                if record is not None:
+                    _restore(record, snapshot)
+            raise
+        if changed and not data_manager.SHARED:
+            # Put them back in case the cache let one go while the block awaited
+            for record_id, record in changed.items():
+                player_data.records[record_id] = record
+            mark_dirty(*changed)
+        if changed:
+            for callback in _commit_listeners:
+                callback(changed)
+    finally:
+        for stripe in reversed(stripes):
+            _locks[stripe].release()
+
+@asynccontextmanager
+async def player_tx(user_id, create=True):
+    """transaction() for a single player; yields the Player (or None)."""
+    async with transaction(user_id, create=create) as (player,):
+        yield player
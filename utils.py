@@ -1,20 +1,112 @@
-from datetime import datetime, timedelta
+import asyncio
+import functools
+import discord
+from discord.ext import commands
+from config import MEMBERS_INTENT, STALE_RETRIES
 from data_manager import recipes_db, items_db
+from storage import StaleWrite
+from transactions import transaction
+from leveling import xp_curve, stat_points_between
+from crafting import recipe_book
 
 def gain_xp(player, amount):
     """Adds XP to the player and handles leveling up. Returns (leveled_up, new_level)"""
-    player["xp"] += amount
-    leveled_up = False
-    while player["xp"] >= player["max_xp"]:
-        player["xp"] -= player["max_xp"]
-        player["level"] += 1
-        # Increase max xp for next level (e.g., +20%)
-        player["max_xp"] = int(player["max_xp"] * 1.2)
-        # Grant 2 stat points every 5 levels
-        if player["level"] % 5 == 0:
-            player["stat_points"] += 2
-        leveled_up = True
-    return leveled_up, player["level"]
+    level = player["level"]
+    xp = player["xp"] + amount
+    if xp < player["max_xp"]:
+        player["xp"] = xp
+        return False, level
+    # Whatever is left past this level is placed on the curve in one lookup
+    total = xp_curve.total(level + 1) + xp - player["max_xp"]
+    new_level = xp_curve.level_for(total)
+    player["level"] = new_level
+    player["xp"] = total - xp_curve.total(new_level)
+    player["max_xp"] = xp_curve.cost(new_level)
+    # Grant 2 stat points every 5 levels
+    player["stat_points"] = player.get("stat_points", 0) + stat_points_between(level, new_level)
+    return True, new_level
+
+GRANT_BATCH = 200
+
+async def grant_xp(user_ids, amount):
+    """Gives `amount` XP to every listed player (event rewards, admin grants).
+
+    Players are granted GRANT_BATCH at a time, each batch its own
+    transaction, so a whole server never holds most of the lock stripes (or
+    the event loop) at once. A batch refused as stale is run again, up to
+    STALE_RETRIES times; batches already granted are kept either way, so
+    callers must not be wrapped in retry_stale(). Players without a profile
+    are skipped. Returns the ids that got XP, {user_id: (old_level,
+    new_level)} for everyone who leveled up and the ids given up on as stale.
+    """
+    leveled = {}
+    granted = []
+    stale = []
+    for start in range(0, len(user_ids), GRANT_BATCH):
+        batch = user_ids[start:start + GRANT_BATCH]
+        for attempt in range(STALE_RETRIES):
+            batch_granted, batch_leveled = [], {}
+            try:
+                async with transaction(*batch, create=False) as players:
+                    for user_id, player in zip(batch, players):
+                        if not player:
+                            continue
+                        old_level = player["level"]
+                        up, new_level = gain_xp(player, amount)
+                        batch_granted.append(user_id)
+                        if up:
+                            batch_leveled[user_id] = (old_level, new_level)
+            except StaleWrite:
+                continue
+            granted += batch_granted
+            leveled.update(batch_leveled)
+            break
+        else:
+            stale += batch
+        # Let other commands in between batches
+        await asyncio.sleep(0)
+    return granted, leveled, stale
+
+STALE_REPLY = "⚠️ Your profile was changed elsewhere at the same moment, so nothing happened. Please try again."
+
+def retry_stale(func):
+    """Runs a command or button callback again when its transaction is refused as stale.
+
+    Only for callbacks that reply after their transactions commit, so a
+    refused attempt hasn't told the user anything. After STALE_RETRIES
+    refusals the user is told nothing happened.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        for _ in range(STALE_RETRIES):
+            try:
+                return await func(*args, **kwargs)
+            except StaleWrite:
+                pass
+        for arg in args:
+            if isinstance(arg, commands.Context):
+                return await arg.send(STALE_REPLY)
+            if isinstance(arg, discord.Interaction):
+                send = arg.followup.send if arg.response.is_done() else arg.response.send_message
+                return await send(STALE_REPLY, ephemeral=True)
+    return wrapper
+
+async def guild_members(guild):
+    """Every member of a guild, or None when the member list couldn't be fetched.
+
+    Guilds aren't chunked at startup, so until this has run for a guild its
+    member cache only holds whoever the bot happened to see. Without the
+    members intent there is no way to get the full list, so always None.
+    """
+    if not MEMBERS_INTENT:
+        return None
+    if not guild.chunked:
+        try:
+            await guild.chunk()
+        except (discord.DiscordException, asyncio.TimeoutError) as e:
+            print(f'⚠️ Could not fetch the members of {guild.name}: {e}')
+            return None
+    return guild.members
 
 def format_currency(total_pence):
     pounds = total_pence // 240
@@ -26,16 +118,6 @@ def format_currency(total_pence):
     if pence > 0 or not parts: parts.append(f"**{pence}** Pence")
     return ", ".join(parts)
 
-def check_cooldown(player, command_key, hours):
-    last_time_str = player.get(command_key)
-    if not last_time_str: return True, 0
-    try: last_time = datetime.fromisoformat(last_time_str)
-    except: return True, 0
-    now = datetime.now()
-    delta = now - last_time
-    if delta >= timedelta(hours=hours): return True, 0
-    return False, timedelta(hours=hours) - delta
-
 def format_timedelta(td):
     total_seconds = int(td.total_seconds())
     hours, remainder = divmod(total_seconds, 3600)
@@ -46,13 +128,21 @@ def format_timedelta(td):
     if seconds > 0 or not parts: parts.append(f"{seconds}s")
     return " ".join(parts)
 
-def craft_item(player, recipe_category, recipe_id):
+def item_name(item_id):
+    # Crafted products aren't in items.json; they're named after their recipe
+    item = items_db.get(item_id)
+    if item: return item["name"]
+    return recipe_book.products.get(item_id, item_id)
+
+def craft_item(player, recipe_category, recipe_id, times=1):
+    """Crafts a recipe `times` times in one go, adding the product to the inventory."""
     recipe = recipes_db.get(recipe_category, {}).get(recipe_id)
     if not recipe: return False, "Recipe not found."
-    temp_inv = player["inventory"].copy()
-    for ing_id, count in recipe["ingredients"].items():
-        for _ in range(count):
-            if ing_id in temp_inv: temp_inv.remove(ing_id)
-            else: return False, f"Missing ingredient: {items_db.get(ing_id, {}).get('name', ing_id)} (needs {count})."
-    player["inventory"] = temp_inv
+    needed = {ing_id: count * times for ing_id, count in recipe["ingredients"].items()}
+    missing = player["inventory"].missing(needed)
+    if missing:
+        ing_id, count = missing
+        return False, f"Missing ingredient: {item_name(ing_id)} (needs {count})."
+    player["inventory"].remove_many(needed)
+    player["inventory"].add(recipe_id, times)
     return True, recipe